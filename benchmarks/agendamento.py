@@ -0,0 +1,111 @@
+import os
+import sys
+import tempfile
+import time
+import multiprocessing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+# Teste de carga do agendamento com vários processos, cada um com o seu app e
+# a sua engine (como os workers do gunicorn), sobre o mesmo banco:
+# - disputa: em cada rodada todos os processos pedem, ao mesmo tempo
+#   (barreira), o mesmo horário do mesmo médico. Exatamente um POST deve
+#   receber 201 e os demais 400; qualquer 500 é falha.
+# - vazão: cada processo agenda horários livres do seu próprio médico, todos em
+#   paralelo; todos devem receber 201.
+# Usa um banco SQLite temporário (ou o de DATABASE_URL, que é modificado);
+# sai com código 1 se alguma verificação falhar.
+#
+# Uso: python benchmarks/agendamento.py [processos] [rodadas] [agendamentos_por_processo]
+
+INICIO = datetime(2030, 1, 7, 8, 0)
+
+def horario(indice):
+    return (INICIO + timedelta(minutes=30 * indice)).strftime('%Y-%m-%dT%H:%M')
+
+def agendar(cliente, cabecalhos, medico_id, indice):
+    resposta = cliente.post('/api/consultas', headers=cabecalhos, json={
+        'paciente_id': 1, 'medico_id': medico_id, 'data_hora': horario(indice), 'tipo_consulta': 'Consulta'
+    })
+    return resposta.status_code
+
+def trabalhador(url, numero, barreira, rodadas, agendamentos, fila):
+    from src.main import create_app
+
+    app = create_app({'DATABASE_URL': url, 'TESTING': True})
+    cliente = app.test_client()
+    token = cliente.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+    cabecalhos = {'Authorization': f'Bearer {token}'}
+
+    disputa = []
+    for rodada in range(rodadas):
+        barreira.wait()
+        disputa.append(agendar(cliente, cabecalhos, 1, rodada))
+
+    barreira.wait()
+    inicio = time.perf_counter()
+    proprios = [agendar(cliente, cabecalhos, numero + 2, indice) for indice in range(agendamentos)]
+    fila.put((numero, disputa, proprios, inicio, time.perf_counter()))
+
+def preparar(url, processos):
+    from src.main import create_app
+    from src.models.schema import inicializar_banco
+    from src.models.user import db
+    from src.models.paciente import Paciente
+    from src.models.medico import Medico
+
+    app = create_app({'DATABASE_URL': url, 'TESTING': True})
+    with app.app_context():
+        inicializar_banco()
+        db.session.add(Paciente(nome='Paciente', cpf='000.000.000-00', data_nascimento=date(1980, 1, 1)))
+        for i in range(1, processos + 2):
+            db.session.add(Medico(nome=f'Médico {i}', crm=f'CRM/SP {i:06d}', especialidade='Clínica Geral'))
+        db.session.commit()
+
+def main():
+    processos = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rodadas = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    agendamentos = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    with tempfile.TemporaryDirectory() as pasta:
+        url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(pasta, 'agendamento.db')}"
+        preparar(url, processos)
+
+        contexto = multiprocessing.get_context('spawn')
+        barreira = contexto.Barrier(processos)
+        fila = contexto.Queue()
+        workers = [
+            contexto.Process(target=trabalhador, args=(url, numero, barreira, rodadas, agendamentos, fila))
+            for numero in range(processos)
+        ]
+        for worker in workers:
+            worker.start()
+        resultados = [fila.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    falhas = []
+    for rodada in range(rodadas):
+        respostas = Counter(disputa[rodada] for _, disputa, _, _, _ in resultados)
+        if respostas[201] != 1 or respostas[400] != processos - 1:
+            falhas.append(f'rodada {rodada}: {dict(respostas)} (esperado 1x201 e {processos - 1}x400)')
+
+    proprios = Counter(status for _, _, lista, _, _ in resultados for status in lista)
+    if proprios[201] != processos * agendamentos:
+        falhas.append(f'horários livres: {dict(proprios)} (esperado {processos * agendamentos}x201)')
+
+    duracao = max(fim for *_, fim in resultados) - min(inicio for *_, inicio, _ in resultados)
+    print(f'disputa: {rodadas} rodadas com {processos} processos pelo mesmo horário')
+    print(f'vazão: {processos * agendamentos} agendamentos em {duracao:.2f}s '
+          f'({processos * agendamentos / duracao:,.0f}/s com {processos} processos)')
+
+    for falha in falhas:
+        print(f'FALHOU: {falha}')
+    if falhas:
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+import os
+import sys
+import argparse
+import hashlib
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import date, timedelta
+from sqlalchemy import event, func
+
+# Verifica o arquivamento de consultas (models/arquivo.py) num SQLite
+# temporário populado por gerar_dados.py: relatórios, listagem paginada,
+# stream NDJSON e exportação CSV devem responder igual antes e depois de
+# arquivar, uma listagem de período recente não pode ler linhas do arquivo e
+# ids de consultas arquivadas não podem ser reutilizados.
+# Mostra também o tamanho da tabela consultas e a latência das rotas antes e
+# depois. Sai com código 1 se alguma verificação falhar.
+#
+# Uso: python benchmarks/arquivo.py [--consultas 60000] [--dias 30]
+
+def percorrer_paginas(cliente, cabecalhos, filtros):
+    ids = []
+    cursor = None
+    while True:
+        url = f'/api/consultas?limit=500&{filtros}' + (f'&after={cursor}' if cursor else '')
+        pagina = cliente.get(url, headers=cabecalhos).get_json()
+        ids += [consulta['id'] for consulta in pagina['consultas']]
+        cursor = pagina['proximo_cursor']
+        if not cursor:
+            return ids
+
+def respostas(cliente, cabecalhos, paciente_id, medico_id):
+    inicio_ano = (date.today() - timedelta(days=365)).isoformat()
+    fim_ano = (date.today() + timedelta(days=365)).isoformat()
+    antigo = (date.today() - timedelta(days=90)).isoformat()
+    get = lambda url: cliente.get(url, headers=cabecalhos)
+    return {
+        'dashboard': get('/api/relatorios/dashboard').get_json()['estatisticas'],
+        'por medico': get(f'/api/relatorios/consultas-por-medico?data_inicio={inicio_ano}&data_fim={fim_ano}').get_json(),
+        'por periodo': get(
+            f'/api/relatorios/consultas-por-periodo?data_inicio={inicio_ano}&data_fim={fim_ano}&agrupamento=mes'
+        ).get_json(),
+        'especialidades': get('/api/relatorios/especialidades-mais-procuradas').get_json(),
+        'pacientes frequentes': get('/api/relatorios/pacientes-frequentes').get_json(),
+        'paginas': percorrer_paginas(cliente, cabecalhos, ''),
+        'paginas desde 90 dias': percorrer_paginas(cliente, cabecalhos, f'data_inicio={antigo}'),
+        'paginas do paciente': percorrer_paginas(cliente, cabecalhos, f'paciente_id={paciente_id}'),
+        'lista do medico': [c['id'] for c in get(f'/api/consultas?medico_id={medico_id}').get_json()],
+        'stream': hashlib.sha1(get('/api/consultas/stream?fields=id,data_hora,status').data).hexdigest(),
+        'csv': hashlib.sha1(get('/api/consultas/export.csv').data).hexdigest(),
+        # Sem id e data_hora nas colunas pedidas, que ordenam a intercalação com o arquivo
+        'csv com fields': hashlib.sha1(get('/api/consultas/export.csv?fields=status,paciente_nome').data).hexdigest(),
+    }
+
+def latencias(cliente, cabecalhos, repeticoes=20):
+    recente = (date.today() - timedelta(days=7)).isoformat()
+    rotas = {
+        'consultas: pagina': '/api/consultas?limit=50',
+        'consultas: ultima semana': f'/api/consultas?limit=50&data_inicio={recente}',
+        'pacientes frequentes': '/api/relatorios/pacientes-frequentes',
+    }
+    resultado = {}
+    for nome, url in rotas.items():
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            cliente.get(url, headers=cabecalhos)
+        resultado[nome] = (time.perf_counter() - inicio) / repeticoes * 1000
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificação do arquivamento de consultas.')
+    parser.add_argument('--consultas', type=int, default=60000)
+    parser.add_argument('--dias', type=int, default=30, help='horizonte do arquivamento')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        from src.main import create_app
+        from src.models.schema import inicializar_banco
+        from src.models.user import db
+        from src.models.consulta import Consulta
+        from src.models.paciente import Paciente
+        from src.models.medico import Medico
+        from src.models.arquivo import ConsultaArquivada, arquivar
+        from gerar_dados import gerar
+
+        app = create_app({'DATABASE_URL': f"sqlite:///{os.path.join(pasta, 'arquivo.db')}", 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+        gerar(app, 2000, 20, args.consultas)
+
+        cliente = app.test_client()
+        token = cliente.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+        cabecalhos = {'Authorization': f'Bearer {token}'}
+
+        antes = respostas(cliente, cabecalhos, 1, 1)
+        latencia_antes = latencias(cliente, cabecalhos)
+        with app.app_context():
+            ativas_antes = db.session.query(Consulta).count()
+            inicio = time.perf_counter()
+            arquivadas = arquivar(args.dias)
+            duracao = time.perf_counter() - inicio
+            ativas_depois = db.session.query(Consulta).count()
+            no_arquivo = db.session.query(ConsultaArquivada).count()
+        # As consultas geradas cobrem poucos dias para trás quando são poucas
+        # por médico: sem nada no arquivo não há o que verificar
+        if not arquivadas:
+            print(f'FALHOU: nenhuma consulta arquivada (nenhuma realizada ou cancelada há mais de '
+                  f'{args.dias} dias); aumente --consultas ou reduza --dias')
+            sys.exit(1)
+        depois = respostas(cliente, cabecalhos, 1, 1)
+        latencia_depois = latencias(cliente, cabecalhos)
+
+        # Listagem recente: o arquivo só pode ser tocado pelo MAX(data_hora)
+        lidas_do_arquivo = []
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            if 'consultas_arquivo' in statement and 'max(' not in statement.lower():
+                lidas_do_arquivo.append(statement)
+        recente = (date.today() - timedelta(days=max(args.dias - 7, 0))).isoformat()
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            cliente.get(f'/api/consultas?limit=50&data_inicio={recente}', headers=cabecalhos)
+            cliente.get('/api/consultas?limit=50', headers=cabecalhos)
+            event.remove(db.engine, 'before_cursor_execute', registrar)
+
+        # Ids não são reutilizados: sem a consulta de maior id (paciente
+        # excluído), a próxima consulta ainda recebe um id novo e as
+        # arquivadas continuam acessíveis pelo id
+        with app.app_context():
+            maior_id = max(
+                db.session.query(func.max(modelo.id)).scalar() or 0 for modelo in (Consulta, ConsultaArquivada)
+            )
+            paciente_do_maior = (
+                db.session.get(Consulta, maior_id) or db.session.get(ConsultaArquivada, maior_id)
+            ).paciente_id
+            # Arquivada de outro paciente, que continua existindo depois da exclusão
+            arquivada = db.session.query(ConsultaArquivada.id).filter(
+                ConsultaArquivada.paciente_id != paciente_do_maior
+            ).order_by(ConsultaArquivada.id.desc()).first()[0]
+            outro_paciente = db.session.query(Paciente.id).filter(Paciente.id != paciente_do_maior).first()[0]
+            medico_id = db.session.query(Medico.id).first()[0]
+        cliente.delete(f'/api/pacientes/{paciente_do_maior}', headers=cabecalhos)
+        nova = cliente.post('/api/consultas', headers=cabecalhos, json={
+            'paciente_id': outro_paciente, 'medico_id': medico_id,
+            'data_hora': '2031-01-06T03:00', 'tipo_consulta': 'Consulta'
+        }).get_json()
+        arquivada_acessivel = cliente.get(f'/api/consultas/{arquivada}', headers=cabecalhos).status_code == 200
+
+    print(f'{arquivadas} consultas arquivadas em {duracao:.1f}s; '
+          f'tabela consultas: {ativas_antes} -> {ativas_depois} linhas ({no_arquivo} no arquivo)')
+    print(f"{'rota':<28}{'antes ms':>10}{'depois ms':>11}")
+    for nome in latencia_antes:
+        print(f'{nome:<28}{latencia_antes[nome]:>10.1f}{latencia_depois[nome]:>11.1f}')
+
+    falhas = [f'{nome} diverge depois do arquivamento' for nome in antes if antes[nome] != depois[nome]]
+    if nova.get('id', 0) <= maior_id:
+        falhas.append(f"nova consulta recebeu o id {nova.get('id')}, já usado (maior: {maior_id})")
+    if not arquivada_acessivel:
+        falhas.append(f'consulta arquivada {arquivada} inacessível por GET /api/consultas/<id>')
+    if lidas_do_arquivo:
+        falhas.append(f'listagem recente leu o arquivo: {lidas_do_arquivo[0][:120]}')
+    for falha in falhas:
+        print(f'FALHOU: {falha}')
+    if falhas:
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
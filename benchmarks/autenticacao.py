@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Custo da autenticação por requisição: conferir usuário e senha a cada
+# chamada (HTTP Basic, PBKDF2 de propósito lento) contra verificar o token
+# assinado com o estado do usuário em cache. Mede também a vazão de uma rota
+# leve da API com o token. Usa um banco SQLite temporário.
+#
+# Uso: python benchmarks/autenticacao.py [repeticoes]
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as pasta:
+        from src.main import create_app
+        from src.models.schema import inicializar_banco
+        from src.models.user import User
+        from src.utils.autenticacao import cache_usuarios, gerar_token, verificar_token
+
+        app = create_app({'DATABASE_URL': f"sqlite:///{os.path.join(pasta, 'autenticacao.db')}", 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+
+        with app.test_request_context():
+            admin = User.query.filter_by(username='admin').first()
+            token = gerar_token(admin)
+
+            def senha():
+                user = User.query.filter_by(username='admin').first()
+                assert user.check_password('admin123')
+
+            def token_valido():
+                assert verificar_token(token) == admin.id
+
+            por_senha = min(timeit.repeat(senha, number=repeticoes, repeat=3)) / repeticoes
+            por_token = min(timeit.repeat(token_valido, number=repeticoes, repeat=3)) / repeticoes
+
+        cliente = app.test_client()
+        cabecalhos = {'Authorization': f'Bearer {token}'}
+        requisitar = lambda: cliente.get('/api/medicos/especialidades', headers=cabecalhos)
+        assert requisitar().status_code == 200
+        por_requisicao = min(timeit.repeat(requisitar, number=repeticoes, repeat=3)) / repeticoes
+
+    print(f'usuário e senha (PBKDF2) por requisição: {por_senha * 1000:.2f} ms')
+    print(f'token assinado + estado em cache:         {por_token * 1000:.3f} ms '
+          f'({por_senha / por_token:.0f}x mais rápido)')
+    print(f'GET autenticado ponta a ponta:            {por_requisicao * 1000:.2f} ms '
+          f'({1 / por_requisicao:,.0f} req/s)')
+    print(f"cache de usuários: {cache_usuarios.estatisticas()}")
+
+if __name__ == '__main__':
+    main()
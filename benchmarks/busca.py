@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Latência da busca de pacientes (GET /api/pacientes/buscar) com o índice FTS5
+# de models/busca.py contra o caminho LIKE '%termo%' anterior, sem limite (como
+# era) e com o mesmo limite da rota (o fallback fora do SQLite). Cada medição
+# inclui a query e o to_dict dos resultados. No caminho FTS5, termos só
+# numéricos (CPF) usam o índice trigram dos dígitos do documento. Usa um banco
+# SQLite temporário populado por gerar_dados.py.
+#
+# Uso: python benchmarks/busca.py [pacientes] [repeticoes]
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as pasta:
+        from src.main import create_app
+        from src.models.schema import inicializar_banco
+        from src.models.paciente import Paciente
+        from src.models.busca import buscar_ids, carregar_em_ordem
+        from src.routes.paciente import LIMITE_BUSCA
+        from gerar_dados import cpf, gerar
+
+        app = create_app({'DATABASE_URL': f"sqlite:///{os.path.join(pasta, 'busca.db')}", 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+        gerar(app, quantidade, 1, 0)
+
+        termos = {
+            'sobrenome comum': 'Silva',
+            'prefixo': 'Mar',
+            'sem acento': 'joao',
+            'nome e sobrenome': 'Ana Silva',
+            'trecho do CPF': cpf(quantidade // 2)[:7],
+            'meio do CPF': cpf(quantidade // 2)[4:10],
+            'sem resultado': 'Xyzw',
+        }
+
+        def like(termo, limite=None):
+            query = Paciente.query.filter(Paciente.nome.contains(termo) | Paciente.cpf.contains(termo))
+            if limite:
+                query = query.limit(limite)
+            return [paciente.to_dict() for paciente in query.all()]
+
+        def fts(termo):
+            ids = buscar_ids('pacientes', termo, LIMITE_BUSCA)
+            return [paciente.to_dict() for paciente in carregar_em_ordem(Paciente, ids)]
+
+        caminhos = {
+            'LIKE sem limite': lambda termo: like(termo),
+            f'LIKE limite {LIMITE_BUSCA}': lambda termo: like(termo, LIMITE_BUSCA),
+            f'FTS5 limite {LIMITE_BUSCA}': fts,
+        }
+
+        print(f'{quantidade} pacientes, mediana de {repeticoes} buscas (ms; resultados entre parênteses)')
+        print(f"{'termo':<30}" + ''.join(f'{nome:>22}' for nome in caminhos))
+        with app.app_context():
+            for descricao, termo in termos.items():
+                linha = f"{f'{descricao} ({termo})':<30}"
+                for buscar in caminhos.values():
+                    resultados = len(buscar(termo))
+                    tempos = sorted(timeit.repeat(lambda: buscar(termo), number=1, repeat=repeticoes))
+                    linha += f'{tempos[len(tempos) // 2] * 1000:>14.1f} ({resultados:>5})'
+                print(linha)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+import os
+import sys
+import argparse
+import http.client
+import json
+import logging
+import random
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import date, datetime, timedelta
+
+# Benchmark de carga de toda a API: exercita as rotas de cada blueprint pelo
+# test client do Flask (padrão) ou por um servidor WSGI local (--servidor) e
+# mostra latência p50/p95/p99 e vazão por rota. Sem --banco, cria um SQLite
+# temporário populado por gerar_dados.py na escala escolhida.
+#
+# Para acompanhar regressões, grave uma execução com --json base.json e compare
+# as seguintes com --comparar base.json (sai com código 1 se o p95 de alguma
+# rota piorar além da tolerância).
+#
+# Uso: python benchmarks/carga.py --escala media --requisicoes 200 [--servidor --concorrencia 8]
+
+ESCALAS = {
+    'pequena': {'pacientes': 2000, 'medicos': 50, 'consultas': 10000},
+    'media': {'pacientes': 20000, 'medicos': 200, 'consultas': 200000},
+    'grande': {'pacientes': 200000, 'medicos': 1000, 'consultas': 2000000},
+}
+
+# Cada rota é (nome, função que sorteia a requisição: (método, url, corpo))
+def rotas(aleatorio, ids_pacientes, ids_medicos, ids_consultas):
+    hoje = date.today()
+    inicio_ano = hoje.replace(month=1, day=1).isoformat()
+    fim_ano = hoje.replace(month=12, day=31).isoformat()
+    termos = ('Silva', 'Ana', 'Souza', 'Carlos', 'Lima', 'Pereira', 'Maria')
+
+    def get(url):
+        return lambda: ('GET', url, None)
+
+    def consulta_nova():
+        # Horários em 2090+, distantes dos dados gerados, para não colidir
+        minutos = aleatorio.randint(0, 10 ** 7) * 30
+        data_hora = datetime(2090, 1, 1) + timedelta(minutes=minutos)
+        return ('POST', '/api/consultas', {
+            'paciente_id': aleatorio.choice(ids_pacientes),
+            'medico_id': aleatorio.choice(ids_medicos),
+            'data_hora': data_hora.strftime('%Y-%m-%dT%H:%M'),
+            'tipo_consulta': 'Consulta'
+        })
+
+    return [
+        ('user: listar', get('/api/users')),
+        ('paciente: listar (fields)', get('/api/pacientes?fields=id,nome')),
+        ('paciente: obter', lambda: ('GET', f'/api/pacientes/{aleatorio.choice(ids_pacientes)}', None)),
+        ('paciente: buscar', lambda: ('GET', f'/api/pacientes/buscar?q={aleatorio.choice(termos)}', None)),
+        ('medico: listar', get('/api/medicos')),
+        ('medico: especialidades', get('/api/medicos/especialidades')),
+        ('medico: buscar', lambda: ('GET', f'/api/medicos/buscar?q={aleatorio.choice(termos)}', None)),
+        ('medico: horarios livres', lambda: (
+            'GET', f'/api/medicos/{aleatorio.choice(ids_medicos)}/horarios-livres?data={hoje.isoformat()}', None
+        )),
+        ('consulta: pagina', get('/api/consultas?limit=50')),
+        ('consulta: pagina por medico', lambda: (
+            'GET', f'/api/consultas?limit=50&medico_id={aleatorio.choice(ids_medicos)}', None
+        )),
+        ('consulta: obter', lambda: ('GET', f'/api/consultas/{aleatorio.choice(ids_consultas)}', None)),
+        ('consulta: criar', consulta_nova),
+        ('relatorio: dashboard', get('/api/relatorios/dashboard')),
+        ('relatorio: por medico', get(f'/api/relatorios/consultas-por-medico?data_inicio={inicio_ano}&data_fim={fim_ano}')),
+        ('relatorio: por periodo', get(
+            f'/api/relatorios/consultas-por-periodo?data_inicio={inicio_ano}&data_fim={fim_ano}&agrupamento=mes'
+        )),
+        ('relatorio: especialidades', get('/api/relatorios/especialidades-mais-procuradas')),
+        ('relatorio: pacientes frequentes', get('/api/relatorios/pacientes-frequentes')),
+        ('lookup: pacientes', lambda: ('GET', f'/api/lookup/pacientes?q={aleatorio.choice(termos)}', None)),
+        ('lookup: medicos', lambda: ('GET', f'/api/lookup/medicos?q={aleatorio.choice(termos)}', None)),
+    ]
+
+# Token do usuário admin criado na inicialização (ver main.py)
+def autenticar(app):
+    resposta = app.test_client().post('/api/login', json={'username': 'admin', 'password': 'admin123'})
+    return {'Authorization': f"Bearer {resposta.get_json()['token']}"}
+
+# Clientes: test client (no processo) ou HTTP para um servidor WSGI local
+def cliente_flask(app, autorizacao):
+    cliente = app.test_client()
+    def requisitar(metodo, url, corpo):
+        return cliente.open(url, method=metodo, json=corpo, headers=autorizacao).status_code
+    return requisitar
+
+def cliente_http(porta, autorizacao):
+    locais = threading.local()
+    def requisitar(metodo, url, corpo):
+        if not hasattr(locais, 'conexao'):
+            locais.conexao = http.client.HTTPConnection('127.0.0.1', porta)
+        cabecalhos = dict(autorizacao)
+        if corpo is not None:
+            cabecalhos['Content-Type'] = 'application/json'
+        locais.conexao.request(metodo, url, body=json.dumps(corpo) if corpo is not None else None, headers=cabecalhos)
+        resposta = locais.conexao.getresponse()
+        resposta.read()
+        return resposta.status
+    return requisitar
+
+def iniciar_servidor(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def medir_rota(requisitar, sortear, requisicoes, concorrencia):
+    latencias = []
+    erros = []
+    trava = threading.Lock()
+    restantes = iter(range(requisicoes))
+
+    def trabalhar():
+        while True:
+            with trava:
+                if next(restantes, None) is None:
+                    return
+                metodo, url, corpo = sortear()
+            inicio = time.perf_counter()
+            status = requisitar(metodo, url, corpo)
+            duracao = time.perf_counter() - inicio
+            with trava:
+                latencias.append(duracao)
+                if status >= 400 and status != 404:
+                    erros.append(status)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhar) for _ in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - inicio
+
+    return {
+        'requisicoes': len(latencias),
+        'erros': len(erros),
+        'p50_ms': percentil(latencias, 50) * 1000,
+        'p95_ms': percentil(latencias, 95) * 1000,
+        'p99_ms': percentil(latencias, 99) * 1000,
+        'vazao_rps': len(latencias) / total
+    }
+
+def comparar(resultados, base, tolerancia):
+    regressoes = []
+    for nome, atual in resultados.items():
+        anterior = base.get(nome)
+        if anterior and atual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regressoes.append(f"{nome}: p95 {anterior['p95_ms']:.1f} -> {atual['p95_ms']:.1f} ms")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga da API.')
+    parser.add_argument('--banco', help='URL de um banco já populado (padrão: SQLite temporário)')
+    parser.add_argument('--escala', choices=ESCALAS, default='pequena')
+    parser.add_argument('--requisicoes', type=int, default=200, help='por rota')
+    parser.add_argument('--concorrencia', type=int, default=1)
+    parser.add_argument('--servidor', action='store_true', help='usa um servidor WSGI local em vez do test client')
+    parser.add_argument('--rota', action='append', help='só as rotas cujo nome contém o texto (repetível)')
+    parser.add_argument('--json', help='grava os resultados neste arquivo')
+    parser.add_argument('--comparar', help='compara com resultados gravados com --json')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='piora de p95 aceita (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    pasta = None
+    if args.banco:
+        url = args.banco
+    else:
+        pasta = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(pasta.name, 'carga.db')}"
+
+    from src.main import create_app
+    from src.models.user import db
+    from src.models.schema import inicializar_banco
+    from src.models.paciente import Paciente
+    from src.models.medico import Medico
+    from src.models.consulta import Consulta
+    from gerar_dados import gerar
+
+    app = create_app({'DATABASE_URL': url, 'TESTING': True})
+    with app.app_context():
+        inicializar_banco()
+
+    if not args.banco:
+        escala = ESCALAS[args.escala]
+        print(f"Populando escala {args.escala}: {escala}")
+        gerar(app, escala['pacientes'], escala['medicos'], escala['consultas'])
+
+    with app.app_context():
+        ids_pacientes = [id for (id,) in db.session.query(Paciente.id)]
+        ids_medicos = [id for (id,) in db.session.query(Medico.id)]
+        ids_consultas = [id for (id,) in db.session.query(Consulta.id).limit(100000)]
+
+    autorizacao = autenticar(app)
+    servidor = None
+    if args.servidor:
+        servidor = iniciar_servidor(app)
+        requisitar = cliente_http(servidor.server_port, autorizacao)
+    else:
+        requisitar = cliente_flask(app, autorizacao)
+
+    aleatorio = random.Random(7)
+    resultados = {}
+    print(f"{'rota':<34}{'req':>6}{'erros':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+    for nome, sortear in rotas(aleatorio, ids_pacientes, ids_medicos, ids_consultas):
+        if args.rota and not any(filtro in nome for filtro in args.rota):
+            continue
+        r = medir_rota(requisitar, sortear, args.requisicoes, args.concorrencia)
+        resultados[nome] = r
+        print(f"{nome:<34}{r['requisicoes']:>6}{r['erros']:>7}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['vazao_rps']:>9.0f}")
+
+    if servidor:
+        servidor.shutdown()
+    if pasta:
+        pasta.cleanup()
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.tolerancia)
+        for regressao in regressoes:
+            print(f'REGRESSÃO {regressao}')
+        if regressoes:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+import time
+import multiprocessing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.models.paciente import Paciente
+from src.models.medico import Medico
+from src.models.consulta import Consulta
+from src.models.banco import configurar_pragmas
+
+# Teste de carga de leitura/escrita concorrentes no SQLite, comparando a
+# configuração padrão (journal em modo DELETE) com a de models/banco.py (WAL,
+# synchronous=NORMAL, busy_timeout, mmap e cache). Leitores repetem a listagem
+# de consultas de um médico; escritores inserem consultas com BEGIN IMMEDIATE,
+# como em agenda.agendar. Cada processo simula um worker com sua própria engine.
+#
+# Uso: python benchmarks/concorrencia_banco.py [leitores] [escritores] [segundos]
+
+MEDICOS = 20
+CONSULTAS_INICIAIS = 20000
+
+def criar_engine(url, ajustado):
+    engine = create_engine(url)
+    if ajustado:
+        configurar_pragmas(engine)
+    else:
+        @event.listens_for(engine, 'connect')
+        def journal_padrao(dbapi_connection, connection_record):
+            dbapi_connection.execute('PRAGMA journal_mode = DELETE')
+    return engine
+
+def preparar(url, ajustado):
+    engine = criar_engine(url, ajustado)
+    db.metadata.create_all(engine)
+    inicio = datetime(2024, 1, 1, 8, 0)
+    with engine.begin() as conn:
+        conn.execute(Paciente.__table__.insert(), [
+            {'id': 1, 'nome': 'Paciente', 'cpf': '000.000.000-00', 'data_nascimento': inicio.date()}
+        ])
+        conn.execute(Medico.__table__.insert(), [
+            {'id': i, 'nome': f'Médico {i}', 'crm': f'CRM{i}', 'especialidade': 'Clínica'}
+            for i in range(1, MEDICOS + 1)
+        ])
+        conn.execute(Consulta.__table__.insert(), [
+            {
+                'paciente_id': 1, 'medico_id': i % MEDICOS + 1,
+                'data_hora': inicio + timedelta(minutes=30 * i), 'duracao_minutos': 30,
+                'tipo_consulta': 'Rotina', 'status': 'agendada'
+            }
+            for i in range(CONSULTAS_INICIAIS)
+        ])
+    engine.dispose()
+
+def ler(url, ajustado, segundos, fila):
+    engine = criar_engine(url, ajustado)
+    tabela = Consulta.__table__
+    operacoes = erros = 0
+    fim = time.monotonic() + segundos
+    with engine.connect() as conn:
+        while time.monotonic() < fim:
+            try:
+                conn.execute(
+                    select(tabela).where(tabela.c.medico_id == operacoes % MEDICOS + 1)
+                    .order_by(tabela.c.data_hora.desc()).limit(50)
+                ).all()
+                conn.rollback()
+                operacoes += 1
+            except OperationalError:
+                conn.rollback()
+                erros += 1
+    fila.put(('leitura', operacoes, erros))
+
+def escrever(url, ajustado, segundos, numero, fila):
+    engine = criar_engine(url, ajustado)
+    tabela = Consulta.__table__
+    operacoes = erros = 0
+    inicio = datetime(2030, 1, 1) + timedelta(days=365 * numero)
+    fim = time.monotonic() + segundos
+    with engine.connect() as conn:
+        while time.monotonic() < fim:
+            try:
+                conn.execute(text('BEGIN IMMEDIATE'))
+                conn.execute(tabela.insert().values(
+                    paciente_id=1, medico_id=operacoes % MEDICOS + 1,
+                    data_hora=inicio + timedelta(minutes=operacoes), duracao_minutos=30,
+                    tipo_consulta='Rotina', status='agendada'
+                ))
+                conn.commit()
+                operacoes += 1
+            except OperationalError:
+                conn.rollback()
+                erros += 1
+    fila.put(('escrita', operacoes, erros))
+
+def executar(ajustado, leitores, escritores, segundos):
+    with tempfile.TemporaryDirectory() as pasta:
+        url = f"sqlite:///{os.path.join(pasta, 'carga.db')}"
+        preparar(url, ajustado)
+
+        contexto = multiprocessing.get_context('spawn')
+        fila = contexto.Queue()
+        processos = [
+            contexto.Process(target=ler, args=(url, ajustado, segundos, fila))
+            for _ in range(leitores)
+        ] + [
+            contexto.Process(target=escrever, args=(url, ajustado, segundos, numero, fila))
+            for numero in range(escritores)
+        ]
+        for processo in processos:
+            processo.start()
+        resultados = [fila.get() for _ in processos]
+        for processo in processos:
+            processo.join()
+
+    totais = {'leitura': [0, 0], 'escrita': [0, 0]}
+    for tipo, operacoes, erros in resultados:
+        totais[tipo][0] += operacoes
+        totais[tipo][1] += erros
+    nome = 'ajustado (WAL)' if ajustado else 'padrão (DELETE)'
+    print(
+        f"{nome:<16} leituras: {totais['leitura'][0] / segundos:9,.0f}/s  "
+        f"escritas: {totais['escrita'][0] / segundos:7,.0f}/s  "
+        f"erros: {totais['leitura'][1] + totais['escrita'][1]}"
+    )
+
+def main():
+    leitores = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    escritores = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    segundos = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print(f'{leitores} leitores, {escritores} escritores, {segundos:g}s por configuração')
+    executar(False, leitores, escritores, segundos)
+    executar(True, leitores, escritores, segundos)
+
+if __name__ == '__main__':
+    main()
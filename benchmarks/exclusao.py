@@ -0,0 +1,148 @@
+import os
+import sys
+import re
+import sqlite3
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import date, datetime, timedelta
+
+# Verifica que excluir um paciente ou médico custa um número fixo de comandos
+# SQL, independente de quantas consultas ele tem, e que o resumo diário fica
+# igual ao recalculado do zero depois das exclusões. Os comandos de cada
+# requisição são lidos do cabeçalho Server-Timing (ver utils/metricas.py).
+# Verifica também que um agendamento para um paciente excluído entre a
+# verificação da rota e o bloqueio da agenda responde 404, sem consulta órfã.
+# Usa um banco SQLite temporário; sai com código 1 se alguma verificação falhar.
+#
+# Uso: python benchmarks/exclusao.py [consultas_do_maior]
+
+MEDICOS = 4
+
+def popular(db, Paciente, Medico, Consulta, tamanhos):
+    inicio = datetime(2024, 1, 1, 8, 0)
+    with db.engine.begin() as conn:
+        conn.execute(Paciente.__table__.insert(), [
+            {'id': i, 'nome': f'Paciente {i}', 'cpf': f'{i:011d}', 'data_nascimento': date(1980, 1, 1)}
+            for i in range(1, len(tamanhos) + 1)
+        ])
+        conn.execute(Medico.__table__.insert(), [
+            {'id': i, 'nome': f'Médico {i}', 'crm': f'CRM/SP {i:06d}', 'especialidade': 'Clínica Geral'}
+            for i in range(1, MEDICOS + 1)
+        ])
+        linhas = []
+        horario = 0
+        for paciente_id, quantidade in enumerate(tamanhos, start=1):
+            for i in range(quantidade):
+                linhas.append({
+                    'paciente_id': paciente_id, 'medico_id': horario % MEDICOS + 1,
+                    'data_hora': inicio + timedelta(minutes=30 * (horario // MEDICOS)),
+                    'duracao_minutos': 30, 'tipo_consulta': 'Consulta',
+                    'status': ('agendada', 'realizada', 'cancelada')[i % 3]
+                })
+                horario += 1
+        conn.execute(Consulta.__table__.insert(), linhas)
+
+def resumo_atual(db, ResumoConsultaDiario):
+    return {
+        (r.dia, r.medico_id, r.status): r.total
+        for r in db.session.query(ResumoConsultaDiario).filter(ResumoConsultaDiario.total != 0)
+    }
+
+def excluir(cliente, cabecalhos, url):
+    inicio = time.perf_counter()
+    resposta = cliente.delete(url, headers=cabecalhos)
+    duracao = time.perf_counter() - inicio
+    assert resposta.status_code == 200, resposta.get_json()
+    instrucoes = int(re.search(r'"(\d+) sql"', resposta.headers['Server-Timing']).group(1))
+    return instrucoes, duracao
+
+def main():
+    maior = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tamanhos = [0, 1, 100, maior]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        from src.main import create_app
+        from src.models.schema import inicializar_banco
+        from src.models.user import db
+        from src.models.paciente import Paciente
+        from src.models.medico import Medico
+        from src.models.consulta import Consulta
+        from src.models.resumo import ResumoConsultaDiario, reconstruir_resumo
+
+        app = create_app({'DATABASE_URL': f"sqlite:///{os.path.join(pasta, 'exclusao.db')}", 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+            popular(db, Paciente, Medico, Consulta, tamanhos)
+            reconstruir_resumo()
+
+        cliente = app.test_client()
+        token = cliente.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+        cabecalhos = {'Authorization': f'Bearer {token}'}
+
+        with app.app_context():
+            do_medico = db.session.query(Consulta).filter(Consulta.medico_id == MEDICOS).count()
+            por_paciente = [
+                db.session.query(Consulta).filter(Consulta.paciente_id == paciente_id).count() - (
+                    db.session.query(Consulta)
+                    .filter(Consulta.paciente_id == paciente_id, Consulta.medico_id == MEDICOS).count()
+                )
+                for paciente_id in range(1, len(tamanhos) + 1)
+            ]
+
+        instrucoes, duracao = excluir(cliente, cabecalhos, f'/api/medicos/{MEDICOS}')
+        print(f'médico com   {do_medico:>6} consultas: {instrucoes} comandos SQL, {duracao * 1000:.1f} ms')
+
+        falhas = []
+        contagens = set()
+        for paciente_id, quantidade in enumerate(por_paciente, start=1):
+            instrucoes, duracao = excluir(cliente, cabecalhos, f'/api/pacientes/{paciente_id}')
+            print(f'paciente com {quantidade:>6} consultas: {instrucoes} comandos SQL, {duracao * 1000:.1f} ms')
+            # Sem consultas não há o que descontar do resumo
+            if quantidade:
+                contagens.add(instrucoes)
+        if len(contagens) != 1:
+            falhas.append(f'comandos SQL variam com o número de consultas: {sorted(contagens)}')
+
+        with app.app_context():
+            restantes = db.session.query(Consulta).count()
+            incremental = resumo_atual(db, ResumoConsultaDiario)
+            reconstruir_resumo()
+            recalculado = resumo_atual(db, ResumoConsultaDiario)
+        if restantes:
+            falhas.append(f'{restantes} consultas órfãs')
+        if incremental != recalculado:
+            falhas.append('resumo diário diverge do recalculado')
+
+        # Outro processo exclui o paciente logo antes de a rota bloquear a agenda
+        import src.routes.consulta as rotas_consulta
+        arquivo = os.path.join(pasta, 'exclusao.db')
+        paciente_id = cliente.post('/api/pacientes', headers=cabecalhos, json={
+            'nome': 'Paciente removido', 'cpf': '99999999999', 'data_nascimento': '1980-01-01'
+        }).get_json()['id']
+        agendar = rotas_consulta.agendar
+        def excluir_e_agendar(medico_id, operacao):
+            with sqlite3.connect(arquivo) as conn:
+                conn.execute('DELETE FROM pacientes WHERE id = ?', (paciente_id,))
+            return agendar(medico_id, operacao)
+        rotas_consulta.agendar = excluir_e_agendar
+        try:
+            resposta = cliente.post('/api/consultas', headers=cabecalhos, json={
+                'paciente_id': paciente_id, 'medico_id': 1, 'data_hora': '2031-01-06T10:00', 'tipo_consulta': 'Consulta'
+            })
+        finally:
+            rotas_consulta.agendar = agendar
+        with app.app_context():
+            orfas = db.session.query(Consulta).filter(Consulta.paciente_id == paciente_id).count()
+        if resposta.status_code != 404 or orfas:
+            falhas.append(f'agendamento para paciente excluído: {resposta.status_code}, {orfas} consultas órfãs')
+
+    for falha in falhas:
+        print(f'FALHOU: {falha}')
+    if falhas:
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
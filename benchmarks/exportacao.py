@@ -0,0 +1,106 @@
+import os
+import sys
+import multiprocessing
+import resource
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime, timedelta
+
+# Exporta N consultas sintéticas por GET /api/consultas/export.csv e verifica
+# que o pico de memória do processo durante a exportação fica abaixo de um
+# teto fixo, independente de N. Usa um banco SQLite temporário. O cache de
+# páginas e o mmap do SQLite (limitados por PRAGMA, ver models/banco.py) são
+# reduzidos no processo da exportação para que a medida reflita só o streaming.
+#
+# Uso: python benchmarks/exportacao.py [linhas] [teto_mb]
+
+LOTE_INSERCAO = 50000
+MEDICOS = 50
+
+def memoria_maxima_mb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def popular(db, Paciente, Medico, Consulta, linhas):
+    inicio = datetime(2020, 1, 1, 8, 0)
+    with db.engine.begin() as conn:
+        conn.execute(Paciente.__table__.insert(), [
+            {'id': 1, 'nome': 'Paciente Exportação', 'cpf': '000.000.000-00', 'data_nascimento': inicio.date()}
+        ])
+        conn.execute(Medico.__table__.insert(), [
+            {'id': i, 'nome': f'Médico {i}', 'crm': f'CRM{i}', 'especialidade': 'Clínica'}
+            for i in range(1, MEDICOS + 1)
+        ])
+    for primeiro in range(0, linhas, LOTE_INSERCAO):
+        with db.engine.begin() as conn:
+            conn.execute(Consulta.__table__.insert(), [
+                {
+                    'paciente_id': 1, 'medico_id': i % MEDICOS + 1,
+                    'data_hora': inicio + timedelta(minutes=30 * (i // MEDICOS)),
+                    'duracao_minutos': 30, 'tipo_consulta': 'Consulta de rotina',
+                    'observacoes': 'Retorno em 30 dias' if i % 3 == 0 else None,
+                    'status': 'realizada'
+                }
+                for i in range(primeiro, min(primeiro + LOTE_INSERCAO, linhas))
+            ])
+
+# Roda num processo novo, para que o pico de memória medido não inclua a
+# população do banco
+def exportar(url, fila):
+    os.environ['SQLITE_MMAP_SIZE'] = '0'
+    os.environ['SQLITE_CACHE_SIZE_KB'] = '2048'
+    from src.main import create_app
+    app = create_app({'DATABASE_URL': url, 'TESTING': True})
+
+    cliente = app.test_client()
+    token = cliente.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+    antes = memoria_maxima_mb()
+    inicio = time.perf_counter()
+    resposta = cliente.get(
+        '/api/consultas/export.csv', headers={'Authorization': f'Bearer {token}'}, buffered=False
+    )
+    tamanho = linhas_csv = 0
+    for pedaco in resposta.response:
+        tamanho += len(pedaco)
+        linhas_csv += pedaco.count(b'\n')
+    resposta.close()
+    fila.put((linhas_csv - 1, tamanho, time.perf_counter() - inicio, memoria_maxima_mb() - antes))
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    teto_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    with tempfile.TemporaryDirectory() as pasta:
+        url = f"sqlite:///{os.path.join(pasta, 'exportacao.db')}"
+        from src.main import create_app
+        from src.models.user import db
+        from src.models.schema import inicializar_banco
+        from src.models.paciente import Paciente
+        from src.models.medico import Medico
+        from src.models.consulta import Consulta
+
+        app = create_app({'DATABASE_URL': url, 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+            popular(db, Paciente, Medico, Consulta, linhas)
+            db.engine.dispose()
+
+        contexto = multiprocessing.get_context('spawn')
+        fila = contexto.Queue()
+        processo = contexto.Process(target=exportar, args=(url, fila))
+        processo.start()
+        exportadas, tamanho, duracao, aumento = fila.get()
+        processo.join()
+
+    print(f'{exportadas} linhas, {tamanho / 1024 / 1024:.1f} MB em {duracao:.1f}s '
+          f'({exportadas / duracao:,.0f} linhas/s)')
+    print(f'aumento do pico de memória durante a exportação: {aumento:.1f} MB (teto: {teto_mb:g} MB)')
+    if exportadas != linhas or aumento > teto_mb:
+        print('FALHOU')
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
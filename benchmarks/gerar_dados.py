@@ -0,0 +1,201 @@
+import os
+import sys
+import argparse
+import random
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import date, datetime, time as hora, timedelta
+
+# Gera pacientes, médicos e consultas sintéticos em volume (10 mil a 10 milhões
+# de linhas) com INSERT em lote, para reproduzir em desenvolvimento os
+# problemas de escala das listagens, buscas e relatórios. CPFs têm dígitos
+# verificadores válidos e CRMs seguem o formato CRM/UF NNNNNN; as consultas de
+# cada médico ocupam horários de 30 minutos em dias úteis, sem sobreposição.
+#
+# Uso: python benchmarks/gerar_dados.py --banco sqlite:////tmp/carga.db \
+#          --pacientes 100000 --medicos 500 --consultas 1000000
+
+TAMANHO_LOTE = 50000
+HORARIOS_POR_DIA = 20  # 08:00 às 18:00, de 30 em 30 minutos
+
+PRIMEIROS_NOMES = (
+    'Ana', 'Maria', 'Francisca', 'Antônia', 'Adriana', 'Juliana', 'Márcia', 'Fernanda',
+    'Patrícia', 'Aline', 'Beatriz', 'Camila', 'Letícia', 'Larissa', 'Luana', 'Gabriela',
+    'José', 'João', 'Antônio', 'Francisco', 'Carlos', 'Paulo', 'Pedro', 'Lucas', 'Luiz',
+    'Marcos', 'Luís', 'Gabriel', 'Rafael', 'Daniel', 'Marcelo', 'Bruno', 'Eduardo',
+    'Felipe', 'Raimundo', 'Rodrigo', 'Thiago', 'Gustavo', 'Vinícius', 'Matheus'
+)
+SOBRENOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+    'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes',
+    'Soares', 'Fernandes', 'Vieira', 'Barbosa', 'Rocha', 'Dias', 'Nascimento', 'Andrade',
+    'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas', 'Cardoso', 'Ramos',
+    'Gonçalves', 'Santana', 'Teixeira', 'Araújo', 'Conceição', 'Castelo', 'Monteiro', 'Pinto'
+)
+ESPECIALIDADES = (
+    'Clínica Geral', 'Cardiologia', 'Pediatria', 'Ginecologia', 'Ortopedia',
+    'Dermatologia', 'Oftalmologia', 'Psiquiatria', 'Neurologia', 'Endocrinologia',
+    'Gastroenterologia', 'Otorrinolaringologia', 'Urologia', 'Pneumologia'
+)
+UFS = ('SP', 'RJ', 'MG', 'RS', 'PR', 'SC', 'BA', 'PE', 'CE', 'GO', 'DF', 'PA', 'ES', 'AM')
+TIPOS_CONSULTA = ('Consulta', 'Retorno', 'Exame', 'Primeira consulta', 'Teleconsulta')
+LOGRADOUROS = ('Rua', 'Avenida', 'Travessa', 'Alameda')
+
+def cpf(numero):
+    # 9 dígitos base distintos para cada número (7919 é primo com 10^9)
+    base = [int(d) for d in f'{(numero * 7919 + 12345) % 10 ** 9:09d}']
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(base, range(tamanho + 1, 1, -1)))
+        base.append(0 if soma % 11 < 2 else 11 - soma % 11)
+    d = ''.join(map(str, base))
+    return f'{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}'
+
+def crm(numero, uf):
+    return f'CRM/{uf} {numero:06d}'
+
+def nome_completo(aleatorio):
+    return (f'{aleatorio.choice(PRIMEIROS_NOMES)} {aleatorio.choice(SOBRENOMES)} '
+            f'{aleatorio.choice(SOBRENOMES)}')
+
+def telefone(aleatorio):
+    return f'({aleatorio.randint(11, 99)}) 9{aleatorio.randint(1000, 9999)}-{aleatorio.randint(1000, 9999)}'
+
+def email(nome, numero):
+    return f"{nome.split()[0].lower()}.{numero}@exemplo.com.br"
+
+def pacientes(aleatorio, primeiro_id, quantidade):
+    for id in range(primeiro_id, primeiro_id + quantidade):
+        nome = nome_completo(aleatorio)
+        yield {
+            'id': id,
+            'nome': nome,
+            'data_nascimento': date(1930, 1, 1) + timedelta(days=aleatorio.randint(0, 34000)),
+            'cpf': cpf(id),
+            'endereco': f'{aleatorio.choice(LOGRADOUROS)} {aleatorio.choice(SOBRENOMES)}, {aleatorio.randint(1, 3000)}',
+            'telefone': telefone(aleatorio),
+            'email': email(nome, id)
+        }
+
+def medicos(aleatorio, primeiro_id, quantidade):
+    for id in range(primeiro_id, primeiro_id + quantidade):
+        nome = nome_completo(aleatorio)
+        yield {
+            'id': id,
+            'nome': f'Dr(a). {nome}',
+            'crm': crm(id, aleatorio.choice(UFS)),
+            'especialidade': aleatorio.choice(ESPECIALIDADES),
+            'telefone': telefone(aleatorio),
+            'email': email(nome, id)
+        }
+
+# Dia útil de número `indice` a partir da segunda-feira `inicio`
+def dia_util(inicio, indice):
+    return inicio + timedelta(days=indice // 5 * 7 + indice % 5)
+
+def consultas(aleatorio, quantidade, ids_pacientes, ids_medicos, hoje):
+    # Metade das consultas no passado e metade no futuro
+    horarios_por_medico = -(-quantidade // len(ids_medicos))
+    dias = -(-horarios_por_medico // HORARIOS_POR_DIA)
+    inicio = hoje - timedelta(days=hoje.weekday()) - timedelta(weeks=dias // 10 + 1)
+    agora = datetime.combine(hoje, hora(12))
+
+    for numero in range(quantidade):
+        medico_id = ids_medicos[numero % len(ids_medicos)]
+        horario = numero // len(ids_medicos)
+        dia = dia_util(inicio, horario // HORARIOS_POR_DIA)
+        data_hora = datetime.combine(dia, hora(8)) + timedelta(minutes=30 * (horario % HORARIOS_POR_DIA))
+        sorteio = aleatorio.random()
+        if data_hora < agora:
+            status = 'realizada' if sorteio < 0.85 else 'cancelada'
+        else:
+            status = 'agendada' if sorteio < 0.9 else 'cancelada'
+        yield {
+            'paciente_id': aleatorio.choice(ids_pacientes),
+            'medico_id': medico_id,
+            'data_hora': data_hora,
+            'duracao_minutos': 30,
+            'tipo_consulta': aleatorio.choice(TIPOS_CONSULTA),
+            'observacoes': 'Trazer exames anteriores' if sorteio > 0.95 else None,
+            'status': status,
+            'data_cadastro': data_hora - timedelta(days=aleatorio.randint(1, 60))
+        }
+
+def inserir(db, tabela, linhas):
+    total = 0
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= TAMANHO_LOTE:
+            with db.engine.begin() as conn:
+                conn.execute(tabela.insert(), lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        with db.engine.begin() as conn:
+            conn.execute(tabela.insert(), lote)
+        total += len(lote)
+    return total
+
+def gerar(app, n_pacientes, n_medicos, n_consultas, semente=42, saida=print):
+    from src.models.user import db
+    from src.models.paciente import Paciente
+    from src.models.medico import Medico
+    from src.models.consulta import Consulta
+    from src.models.resumo import reconstruir_resumo
+    from src.models.versao import incrementar_versoes
+    from src.utils.cache import invalidar_tabelas
+    from sqlalchemy import func
+
+    aleatorio = random.Random(semente)
+    with app.app_context():
+        primeiro_paciente = (db.session.query(func.max(Paciente.id)).scalar() or 0) + 1
+        primeiro_medico = (db.session.query(func.max(Medico.id)).scalar() or 0) + 1
+        db.session.rollback()
+
+        etapas = (
+            ('pacientes', Paciente, lambda: pacientes(aleatorio, primeiro_paciente, n_pacientes)),
+            ('medicos', Medico, lambda: medicos(aleatorio, primeiro_medico, n_medicos)),
+            ('consultas', Consulta, lambda: consultas(
+                aleatorio, n_consultas,
+                range(primeiro_paciente, primeiro_paciente + n_pacientes),
+                range(primeiro_medico, primeiro_medico + n_medicos),
+                date.today()
+            )),
+        )
+        for nome, modelo, linhas in etapas:
+            inicio = time.perf_counter()
+            total = inserir(db, modelo.__table__, linhas())
+            duracao = time.perf_counter() - inicio
+            saida(f'{nome}: {total} linhas em {duracao:.1f}s ({total / max(duracao, 1e-9):,.0f}/s)')
+
+        # Resumo diário, versões das tabelas e caches ficam coerentes com o INSERT direto
+        reconstruir_resumo()
+        with db.engine.begin() as conn:
+            incrementar_versoes(conn, 'pacientes', 'medicos', 'consultas')
+        invalidar_tabelas('pacientes', 'medicos', 'consultas')
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos em volume.')
+    parser.add_argument('--banco', default=os.environ.get('DATABASE_URL'),
+                        help='URL do banco (padrão: DATABASE_URL)')
+    parser.add_argument('--pacientes', type=int, default=10000)
+    parser.add_argument('--medicos', type=int, default=100)
+    parser.add_argument('--consultas', type=int, default=100000)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.banco:
+        parser.error('informe --banco ou DATABASE_URL (evita popular database/app.db por engano)')
+    if args.pacientes < 1 or args.medicos < 1:
+        parser.error('são necessários pelo menos 1 paciente e 1 médico')
+
+    from src.main import create_app
+    from src.models.schema import inicializar_banco
+    app = create_app({'DATABASE_URL': args.banco, 'TESTING': True})
+    with app.app_context():
+        inicializar_banco()
+    gerar(app, args.pacientes, args.medicos, args.consultas, args.semente)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import os
+import sys
+import argparse
+import json
+import secrets
+import statistics
+import subprocess
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Custo de inicialização de um worker: importar src.main, montar o app com
+# create_app e atender a primeira requisição autenticada, cada execução num
+# processo Python novo (como um worker do gunicorn ou um teste). O banco é
+# inicializado antes (flask init-db), então nada disso inclui DDL. Mostra
+# também os módulos mais caros de importar, via python -X importtime, e o
+# preparo de um teste com o banco em memória sugerido em main.py (create_app +
+# inicializar_banco + login + primeira requisição).
+#
+# Como em carga.py, grave uma execução com --json base.json e compare as
+# seguintes com --comparar base.json (código 1 se o tempo até a primeira
+# resposta piorar além da tolerância).
+#
+# Uso: python benchmarks/inicializacao.py [--execucoes 5] [--modulos 15]
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Como em produção, os workers recebem SECRET_KEY pelo ambiente: a mesma do
+# processo que emite o token
+CHAVE = secrets.token_hex(32)
+
+# Roda no processo filho: argv[1] = URL do banco, argv[2] = token de acesso
+CODIGO_WORKER = '''
+import json, sys, time
+inicio = time.perf_counter()
+from src.main import create_app
+importado = time.perf_counter()
+app = create_app({'DATABASE_URL': sys.argv[1]})
+criado = time.perf_counter()
+resposta = app.test_client().get(
+    '/api/medicos/especialidades', headers={'Authorization': 'Bearer ' + sys.argv[2]}
+)
+assert resposta.status_code == 200, resposta.status_code
+fim = time.perf_counter()
+print(json.dumps({
+    'importacao_ms': (importado - inicio) * 1000,
+    'create_app_ms': (criado - importado) * 1000,
+    'primeira_requisicao_ms': (fim - criado) * 1000
+}))
+'''
+
+# Roda no processo filho: app de teste com SQLite em memória, do zero
+CODIGO_TESTE = '''
+import json, time
+inicio = time.perf_counter()
+from src.main import create_app
+from src.models.schema import inicializar_banco
+app = create_app({'DATABASE_URL': 'sqlite:///:memory:', 'TESTING': True})
+with app.app_context():
+    inicializar_banco()
+cliente = app.test_client()
+token = cliente.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+resposta = cliente.get('/api/pacientes', headers={'Authorization': 'Bearer ' + token})
+assert resposta.status_code == 200, resposta.status_code
+print(json.dumps({'teste_em_memoria_ms': (time.perf_counter() - inicio) * 1000}))
+'''
+
+def executar(argumentos, *extra, codigo=CODIGO_WORKER):
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, SECRET_KEY=CHAVE)
+    return subprocess.run(
+        [sys.executable, *extra, '-c', codigo, *argumentos],
+        env=ambiente, capture_output=True, text=True, check=True
+    )
+
+def medir(argumentos):
+    inicio = time.perf_counter()
+    saida = executar(argumentos)
+    medida = json.loads(saida.stdout.strip().splitlines()[-1])
+    # Inclui a partida do interpretador
+    medida['total_ms'] = (time.perf_counter() - inicio) * 1000
+    medida.update(json.loads(executar((), codigo=CODIGO_TESTE).stdout.strip().splitlines()[-1]))
+    return medida
+
+# Linhas "import time: self [us] | cumulative | pacote" do -X importtime
+def modulos_mais_lentos(argumentos, quantidade):
+    saida = executar(argumentos, '-X', 'importtime')
+    modulos = []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, proprio, acumulado, nome = (parte.strip() for parte in linha.replace('import time:', '|').split('|'))
+        modulos.append((int(acumulado) / 1000, int(proprio) / 1000, nome))
+    return sorted(modulos, reverse=True)[:quantidade]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização do app.')
+    parser.add_argument('--execucoes', type=int, default=5)
+    parser.add_argument('--modulos', type=int, default=15, help='módulos mais lentos a mostrar')
+    parser.add_argument('--json', help='grava os resultados neste arquivo')
+    parser.add_argument('--comparar', help='compara com resultados gravados com --json')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='piora aceita (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    from src.main import create_app
+    from src.models.schema import inicializar_banco
+    from src.models.user import User
+    from src.utils.autenticacao import gerar_token
+
+    with tempfile.TemporaryDirectory() as pasta:
+        url = f"sqlite:///{os.path.join(pasta, 'inicializacao.db')}"
+        app = create_app({'DATABASE_URL': url, 'SECRET_KEY': CHAVE})
+        with app.app_context():
+            inicio = time.perf_counter()
+            inicializar_banco()
+            init_db_ms = (time.perf_counter() - inicio) * 1000
+            token = gerar_token(User.query.filter_by(username='admin').first())
+        argumentos = (url, token)
+
+        medidas = [medir(argumentos) for _ in range(args.execucoes)]
+        modulos = modulos_mais_lentos(argumentos, args.modulos)
+
+    resultados = {chave: statistics.median(m[chave] for m in medidas) for chave in medidas[0]}
+    print(f'flask init-db (uma vez por implantação, fora da inicialização): {init_db_ms:.0f} ms')
+    print(f'mediana de {args.execucoes} execuções, em processos novos:')
+    print(f"  importar src.main         {resultados['importacao_ms']:>8.1f} ms")
+    print(f"  create_app()              {resultados['create_app_ms']:>8.1f} ms")
+    print(f"  primeira requisição       {resultados['primeira_requisicao_ms']:>8.1f} ms")
+    print(f"  total (com o interpretador) {resultados['total_ms']:>6.1f} ms")
+    print(f"  teste com banco em memória {resultados['teste_em_memoria_ms']:>7.1f} ms")
+    print(f'\n{"acumulado ms":>13}{"próprio ms":>12}  módulo')
+    for acumulado, proprio, nome in modulos:
+        print(f'{acumulado:>13.1f}{proprio:>12.1f}  {nome}')
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            base = json.load(arquivo)
+        if resultados['total_ms'] > base['total_ms'] * (1 + args.tolerancia):
+            print(f"REGRESSÃO total {base['total_ms']:.1f} -> {resultados['total_ms']:.1f} ms")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
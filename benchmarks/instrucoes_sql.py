@@ -0,0 +1,104 @@
+import os
+import sys
+import re
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import date, datetime, timedelta
+
+# Verifica que as rotas que serializam consultas com o nome do paciente e do
+# médico executam o mesmo número de comandos SQL com 1 consulta e com N
+# consultas (de N pacientes e N médicos diferentes), ou seja, que os nomes vêm
+# na mesma query e não de um SELECT por linha (N+1). Os comandos de cada
+# requisição são lidos do cabeçalho Server-Timing (ver utils/metricas.py).
+# Usa um banco SQLite temporário; sai com código 1 se alguma verificação falhar.
+#
+# Uso: python benchmarks/instrucoes_sql.py [consultas]
+
+ROTAS = (
+    '/api/consultas',
+    '/api/consultas?limit=500',
+    '/api/consultas?fields=id,data_hora,paciente_nome,medico_nome',
+    '/api/consultas/1',
+    '/api/relatorios/dashboard',
+)
+
+def popular(db, Paciente, Medico, Consulta, primeiro, quantidade):
+    # Consultas agendadas nos próximos dias, para aparecerem também nas
+    # próximas consultas do dashboard
+    inicio = datetime.combine(date.today() + timedelta(days=1), datetime.min.time()).replace(hour=8)
+    ids = range(primeiro, primeiro + quantidade)
+    with db.engine.begin() as conn:
+        conn.execute(Paciente.__table__.insert(), [
+            {'id': i, 'nome': f'Paciente {i}', 'cpf': f'{i:011d}', 'data_nascimento': date(1980, 1, 1)}
+            for i in ids
+        ])
+        conn.execute(Medico.__table__.insert(), [
+            {'id': i, 'nome': f'Médico {i}', 'crm': f'CRM/SP {i:06d}', 'especialidade': 'Clínica Geral'}
+            for i in ids
+        ])
+        conn.execute(Consulta.__table__.insert(), [
+            {
+                'id': i, 'paciente_id': i, 'medico_id': i,
+                'data_hora': inicio + timedelta(minutes=30 * (i % 16)),
+                'duracao_minutos': 30, 'tipo_consulta': 'Consulta', 'status': 'agendada'
+            }
+            for i in ids
+        ])
+
+def instrucoes(cliente, cabecalhos):
+    contagens = {}
+    for url in ROTAS:
+        resposta = cliente.get(url, headers=cabecalhos)
+        assert resposta.status_code == 200, (url, resposta.get_json())
+        contagens[url] = int(re.search(r'"(\d+) sql"', resposta.headers['Server-Timing']).group(1))
+    return contagens
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as pasta:
+        from src.main import create_app
+        from src.models.schema import inicializar_banco
+        from src.models.user import db
+        from src.models.paciente import Paciente
+        from src.models.medico import Medico
+        from src.models.consulta import Consulta
+        from src.models.resumo import reconstruir_resumo
+        from src.utils.cache import invalidar_tabelas
+
+        app = create_app({'DATABASE_URL': f"sqlite:///{os.path.join(pasta, 'instrucoes.db')}", 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+            popular(db, Paciente, Medico, Consulta, 1, 1)
+            reconstruir_resumo()
+
+        cliente = app.test_client()
+        token = cliente.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+        cabecalhos = {'Authorization': f'Bearer {token}'}
+        # Primeira requisição com o token carrega o usuário para o cache
+        cliente.get('/api/consultas/1', headers=cabecalhos)
+
+        com_uma = instrucoes(cliente, cabecalhos)
+        with app.app_context():
+            popular(db, Paciente, Medico, Consulta, 2, quantidade - 1)
+            reconstruir_resumo()
+        # As inserções acima não passam pela sessão: esvazia o cache do dashboard
+        invalidar_tabelas('pacientes', 'medicos', 'consultas')
+        com_n = instrucoes(cliente, cabecalhos)
+
+    falhas = []
+    print(f"{'rota':<64}{'1 consulta':>12}{f'{quantidade} consultas':>16}")
+    for url in ROTAS:
+        print(f'{url:<64}{com_uma[url]:>12}{com_n[url]:>16}')
+        if com_uma[url] != com_n[url]:
+            falhas.append(f'{url}: {com_uma[url]} comandos SQL com 1 consulta, {com_n[url]} com {quantidade}')
+
+    for falha in falhas:
+        print(f'FALHOU: {falha}')
+    if falhas:
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
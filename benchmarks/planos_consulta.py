@@ -0,0 +1,120 @@
+import os
+import sys
+import re
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import event
+
+# Verifica com EXPLAIN QUERY PLAN que as queries de cada rota usam os índices
+# de consultas (models/consulta.py) e do resumo diário: captura os SELECTs que
+# a rota executa, pede o plano de cada um ao SQLite (mesmos parâmetros) e exige
+# o SEARCH ... USING INDEX esperado. Falha também se algum plano varrer a
+# tabela consultas ou consultas_arquivo inteira (SCAN sem índice de cobertura).
+# Usa um banco SQLite temporário populado por gerar_dados.py; sai com código 1
+# se alguma verificação falhar.
+#
+# Uso: python benchmarks/planos_consulta.py [consultas]
+
+PERIODO = 'data_inicio=2026-01-01&data_fim=2026-02-01'
+
+# (rota, corpo do POST ou None, padrão que algum plano da rota deve conter)
+CASOS = (
+    ('/api/consultas?medico_id=1', None,
+     r'SEARCH consultas USING INDEX ix_consultas_medico_data_hora \(medico_id=\?'),
+    ('/api/consultas?paciente_id=1&limit=50', None,
+     r'SEARCH consultas USING INDEX ix_consultas_paciente_data_hora \(paciente_id=\?'),
+    ('/api/consultas?status=agendada&limit=50', None,
+     r'SEARCH consultas USING INDEX ix_consultas_status_data_hora \(status=\?'),
+    (f'/api/consultas?{PERIODO}&limit=50', None,
+     r'SEARCH consultas USING INDEX ix_consultas_data_hora \(data_hora>\? AND data_hora<\?'),
+    (f'/api/consultas?medico_id=1&{PERIODO}', None,
+     r'SEARCH consultas USING INDEX ix_consultas_medico_data_hora \(medico_id=\? AND data_hora>\? AND data_hora<\?'),
+    # Verificação de conflito de horário do agendamento
+    ('/api/consultas', {'paciente_id': 1, 'medico_id': 1, 'data_hora': '2030-01-07T10:00', 'tipo_consulta': 'Consulta'},
+     r'SEARCH consultas USING INDEX \w+ \(medico_id=\? AND data_hora>\? AND data_hora<\?'),
+    ('/api/relatorios/dashboard', None,
+     r'SEARCH consultas USING INDEX ix_consultas_status_data_hora \(status=\? AND data_hora>\?'),
+    (f'/api/relatorios/consultas-por-medico?{PERIODO}', None,
+     r'SEARCH consultas_resumo_diario USING INDEX \w+ \(dia>\? AND dia<\?'),
+    (f'/api/relatorios/consultas-por-periodo?{PERIODO}', None,
+     r'SEARCH consultas_resumo_diario USING INDEX \w+ \(dia>\? AND dia<\?'),
+    (f'/api/relatorios/especialidades-mais-procuradas?{PERIODO}', None,
+     r'SEARCH consultas_resumo_diario USING INDEX \w+ \(dia>\? AND dia<\?'),
+    # Conta todas as consultas por paciente: lê só o índice, sem a tabela
+    ('/api/relatorios/pacientes-frequentes', None,
+     r'(SEARCH|SCAN) consultas USING COVERING INDEX ix_consultas_paciente_data_hora'),
+)
+
+VARREDURA_COMPLETA = re.compile(r'SCAN (consultas|consultas_arquivo)\b(?! USING COVERING INDEX)')
+
+def planos(app, db, cliente, cabecalhos, url, corpo):
+    from src.models.banco import BIND_LEITURA
+
+    instrucoes = []
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            instrucoes.append((statement, parameters))
+
+    with app.app_context():
+        engines = {db.engine, db.engines.get(BIND_LEITURA, db.engine)}
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', registrar)
+        try:
+            if corpo is None:
+                resposta = cliente.get(url, headers=cabecalhos)
+            else:
+                resposta = cliente.post(url, json=corpo, headers=cabecalhos)
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', registrar)
+        assert resposta.status_code in (200, 201), (url, resposta.get_json())
+
+        resultado = []
+        with db.engine.connect() as conn:
+            sqlite = conn.connection.dbapi_connection
+            for statement, parameters in instrucoes:
+                linhas = sqlite.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+                resultado.append((statement, [linha[3] for linha in linhas]))
+        return resultado
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        from src.main import create_app
+        from src.models.schema import inicializar_banco
+        from src.models.user import db
+        from gerar_dados import gerar
+
+        app = create_app({'DATABASE_URL': f"sqlite:///{os.path.join(pasta, 'planos.db')}", 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+        gerar(app, 2000, 20, quantidade, saida=lambda *args: None)
+
+        cliente = app.test_client()
+        token = cliente.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+        cabecalhos = {'Authorization': f'Bearer {token}'}
+
+        falhas = []
+        for url, corpo, esperado in CASOS:
+            rota = f"{'POST' if corpo else 'GET'} {url}"
+            instrucoes = planos(app, db, cliente, cabecalhos, url, corpo)
+            linhas = [linha for _, plano in instrucoes for linha in plano]
+            encontrado = next((linha for linha in linhas if re.search(esperado, linha)), None)
+            print(f'{rota}\n    {encontrado or "índice esperado não usado"}')
+            if not encontrado:
+                falhas.append(f'{rota}: nenhum plano com {esperado}')
+            for statement, plano in instrucoes:
+                for linha in plano:
+                    if VARREDURA_COMPLETA.search(linha):
+                        falhas.append(f'{rota}: {linha} em {statement[:100]}')
+
+    for falha in falhas:
+        print(f'FALHOU: {falha}')
+    if falhas:
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import gc
+import tempfile
+import time
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# CPU e memória por linha das listagens com ?fields= (SELECT só das colunas
+# pedidas + serializador de linhas, models/projecao.py) contra o caminho
+# completo (entidades do ORM + to_dict), do banco até a lista de dicts. A CPU
+# é o melhor tempo de processo entre as repetições; a memória, o pico alocado
+# (tracemalloc) durante uma execução. Usa um banco SQLite temporário
+# populado por gerar_dados.py.
+#
+# Uso: python benchmarks/projecao.py [consultas] [repeticoes]
+
+def medir(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.process_time()
+        linhas = len(funcao())
+        melhor = min(melhor, time.process_time() - inicio)
+
+    gc.collect()
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return linhas, melhor, pico
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as pasta:
+        from src.main import create_app
+        from src.models.schema import inicializar_banco
+        from src.models.user import db
+        from src.models.paciente import Paciente
+        from src.models.consulta import Consulta
+        from src.models.projecao import query_campos, serializador_campos
+        from src.routes.consulta import CAMPOS_CONSULTA, query_projecao
+        from src.routes.paciente import CAMPOS_PACIENTE
+        from gerar_dados import gerar
+
+        app = create_app({'DATABASE_URL': f"sqlite:///{os.path.join(pasta, 'projecao.db')}", 'TESTING': True})
+        with app.app_context():
+            inicializar_banco()
+        gerar(app, max(quantidade // 10, 1), 50, quantidade, saida=lambda *args: None)
+
+        def entidades(query):
+            def listar():
+                try:
+                    return [obj.to_dict() for obj in query()]
+                finally:
+                    db.session.remove()
+            return listar
+
+        def projecao(query, disponiveis, campos):
+            def listar():
+                serializar = serializador_campos(disponiveis, campos)
+                try:
+                    return [serializar(linha) for linha in query(campos)]
+                finally:
+                    db.session.remove()
+            return listar
+
+        campos_consulta = ['id', 'data_hora', 'status', 'paciente_nome', 'medico_nome']
+        campos_paciente = ['id', 'nome']
+        casos = (
+            ('consultas: to_dict', entidades(lambda: Consulta.query_com_nomes().all())),
+            (f"consultas: fields={','.join(campos_consulta)}",
+             projecao(lambda campos: query_projecao(campos).all(), CAMPOS_CONSULTA, campos_consulta)),
+            ('pacientes: to_dict', entidades(lambda: Paciente.query.all())),
+            (f"pacientes: fields={','.join(campos_paciente)}",
+             projecao(lambda campos: query_campos(Paciente, CAMPOS_PACIENTE, campos).all(),
+                      CAMPOS_PACIENTE, campos_paciente)),
+        )
+
+        print(f"{'listagem':<62}{'linhas':>8}{'CPU µs/linha':>14}{'memória B/linha':>17}")
+        with app.app_context():
+            for nome, listar in casos:
+                linhas, cpu, pico = medir(listar, repeticoes)
+                print(f'{nome:<62}{linhas:>8}{cpu / linhas * 1e6:>14.1f}{pico / linhas:>17,.0f}')
+
+if __name__ == '__main__':
+    main()
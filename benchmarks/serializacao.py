@@ -0,0 +1,86 @@
+import os
+import sys
+import timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from src.models.paciente import Paciente
+from src.models.medico import Medico
+from src.models.consulta import Consulta, serializar_consultas
+from src.utils.json_provider import ProvedorJSON, orjson
+
+# Micro-benchmark da serialização de uma listagem de consultas: to_dict escrito
+# à mão + json da biblioteca padrão (como era) contra o serializador gerado a
+# partir das colunas + ProvedorJSON (orjson, se instalado).
+#
+# Uso: python benchmarks/serializacao.py [quantidade] [repeticoes]
+
+def to_dict_manual(consulta):
+    return {
+        'id': consulta.id,
+        'paciente_id': consulta.paciente_id,
+        'medico_id': consulta.medico_id,
+        'data_hora': consulta.data_hora.isoformat() if consulta.data_hora else None,
+        'duracao_minutos': consulta.duracao_minutos,
+        'tipo_consulta': consulta.tipo_consulta,
+        'observacoes': consulta.observacoes,
+        'status': consulta.status,
+        'data_cadastro': consulta.data_cadastro.isoformat() if consulta.data_cadastro else None,
+        'paciente_nome': consulta.paciente.nome if consulta.paciente else None,
+        'medico_nome': consulta.medico.nome if consulta.medico else None
+    }
+
+def gerar_consultas(quantidade):
+    pacientes = [Paciente(id=i, nome=f'Paciente {i}') for i in range(1, 101)]
+    medicos = [Medico(id=i, nome=f'Médico {i}') for i in range(1, 11)]
+    inicio = datetime(2024, 1, 1, 8, 0)
+    return [
+        Consulta(
+            id=i,
+            paciente=pacientes[i % len(pacientes)],
+            medico=medicos[i % len(medicos)],
+            paciente_id=i % len(pacientes) + 1,
+            medico_id=i % len(medicos) + 1,
+            data_hora=inicio + timedelta(minutes=30 * i),
+            duracao_minutos=30,
+            tipo_consulta='Consulta de rotina',
+            observacoes='Retorno em 30 dias' if i % 3 == 0 else None,
+            status=('agendada', 'realizada', 'cancelada')[i % 3],
+            data_cadastro=inicio
+        )
+        for i in range(1, quantidade + 1)
+    ]
+
+def medir(nome, funcao, quantidade, repeticoes):
+    melhor = min(timeit.repeat(funcao, number=1, repeat=repeticoes))
+    print(f'{nome:<45} {melhor * 1000:8.1f} ms  {quantidade / melhor:12,.0f} linhas/s')
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    app = Flask(__name__)
+    padrao = DefaultJSONProvider(app)
+    rapido = ProvedorJSON(app)
+    consultas = gerar_consultas(quantidade)
+
+    assert [to_dict_manual(c) for c in consultas] == [serializar_consultas(c) for c in consultas]
+
+    print(f'{quantidade} consultas, melhor de {repeticoes} execuções (orjson: {"sim" if orjson else "não"})')
+    medir('to_dict manual', lambda: [to_dict_manual(c) for c in consultas], quantidade, repeticoes)
+    medir('serializador gerado', lambda: [serializar_consultas(c) for c in consultas], quantidade, repeticoes)
+    dicts = [serializar_consultas(c) for c in consultas]
+    with app.app_context():
+        medir('json padrão (dumps)', lambda: padrao.dumps(dicts), quantidade, repeticoes)
+        medir('ProvedorJSON (dumps)', lambda: rapido.dumps(dicts), quantidade, repeticoes)
+        medir('antes: to_dict manual + json padrão', lambda: padrao.response(
+            [to_dict_manual(c) for c in consultas]
+        ), quantidade, repeticoes)
+        medir('depois: serializador gerado + ProvedorJSON', lambda: rapido.response(
+            [serializar_consultas(c) for c in consultas]
+        ), quantidade, repeticoes)
+
+if __name__ == '__main__':
+    main()
@@ -1,72 +1,161 @@
 import os
 import sys
+import click
+import secrets
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from src.models.user import db
-from src.models.paciente import Paciente
-from src.models.medico import Medico
-from src.models.consulta import Consulta
-from src.routes.user import user_bp
-from src.routes.paciente import paciente_bp
-from src.routes.medico import medico_bp
-from src.routes.consulta import consulta_bp
-from src.routes.relatorio import relatorio_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Configurar CORS para permitir requisições do frontend
-CORS(app)
-
-# Registrar blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(paciente_bp, url_prefix='/api')
-app.register_blueprint(medico_bp, url_prefix='/api')
-app.register_blueprint(consulta_bp, url_prefix='/api')
-app.register_blueprint(relatorio_bp, url_prefix='/api')
-
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Criar tabelas e dados iniciais
-with app.app_context():
-    db.create_all()
-    
-    # Criar usuário admin padrão se não existir
-    from src.models.user import User
-    admin = User.query.filter_by(username='admin').first()
-    if not admin:
-        admin = User(
-            username='admin',
-            email='admin@sistema.com',
-            role='admin'
-        )
-        admin.set_password('admin123')
-        db.session.add(admin)
-        db.session.commit()
-        print("Usuário admin criado: admin/admin123")
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+from flask import Flask
+from flask.cli import with_appcontext
+
+# Fábrica da aplicação. Montar o app não toca o banco: a criação/atualização
+# do schema e o usuário admin padrão ficam no comando `flask init-db`, rodado
+# uma vez por implantação. Blueprints e modelos são importados dentro de
+# create_app e os módulos usados só pelos comandos, dentro de cada comando.
+#
+# Uso:
+#   flask --app src.main init-db
+#   flask --app src.main run --debug      (ou python src/main.py, que também inicializa o banco)
+#   gunicorn 'src.main:create_app()'
+#
+# Fora de debug e testes, SECRET_KEY deve estar no ambiente (ou em config).
+#
+# `from src.main import app` continua funcionando: o app padrão é criado no
+# primeiro acesso ao atributo (ver __getattr__ no fim do arquivo).
+
+def create_app(config=None):
+    from flask_cors import CORS
+    from src.models.user import db
+    from src.models.banco import configurar_banco, configurar_engines, rotear_leituras
+    from src.routes.user import user_bp
+    from src.routes.paciente import paciente_bp
+    from src.routes.medico import medico_bp
+    from src.routes.consulta import consulta_bp
+    from src.routes.relatorio import relatorio_bp
+    from src.routes.lookup import lookup_bp
+    from src.utils.json_provider import ProvedorJSON
+    from src.utils.metricas import instrumentar
+    from src.utils.autenticacao import exigir_autenticacao
+    from src.utils.compressao import comprimir_respostas
+    from src.utils.estaticos import Manifesto
+
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    # Assina os tokens de acesso (ver utils/autenticacao.py)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+    # Ex. (testes): create_app({'DATABASE_URL': 'sqlite:///:memory:', 'TESTING': True})
+    # e, no contexto do app, inicializar_banco(): cada app começa com um banco vazio
+    app.config.update(config or {})
+    if not app.config['SECRET_KEY']:
+        # Sem chave fixa no código: quem a conhecesse emitiria tokens de admin.
+        # Em debug/testes, uma chave aleatória por processo (tokens emitidos
+        # antes de reiniciar deixam de valer)
+        if not (app.debug or app.testing):
+            raise RuntimeError('SECRET_KEY não definida: defina a variável de ambiente SECRET_KEY')
+        app.config['SECRET_KEY'] = secrets.token_hex(32)
+    app.json = ProvedorJSON(app)
+
+    # Configurar CORS para permitir requisições do frontend
+    CORS(app)
+
+    # Latência, SQL por requisição e N+1 em /metrics (ver utils/metricas.py)
+    instrumentar(app)
+
+    # Rotas /api exigem token de acesso, exceto /api/login (ver utils/autenticacao.py)
+    app.before_request(exigir_autenticacao)
+
+    # gzip das respostas JSON acima de COMPRESSAO_MINIMA_BYTES (ver utils/compressao.py)
+    comprimir_respostas(app)
+
+    # Registrar blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(paciente_bp, url_prefix='/api')
+    app.register_blueprint(medico_bp, url_prefix='/api')
+    app.register_blueprint(consulta_bp, url_prefix='/api')
+    app.register_blueprint(relatorio_bp, url_prefix='/api')
+    app.register_blueprint(lookup_bp, url_prefix='/api')
+
+    # Configuração do banco de dados (SQLite com WAL ou DATABASE_URL, ver models/banco.py)
+    configurar_banco(app)
+    db.init_app(app)
+    app.before_request(rotear_leituras(db))
+    with app.app_context():
+        # Só registra os pragmas: as engines conectam na primeira consulta
+        configurar_engines(db)
+
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(reconstruir_resumo_command)
+    app.cli.add_command(importar_command)
+    app.cli.add_command(arquivar_command)
+
+    # Frontend servido de um manifesto em memória, pré-comprimido e com nomes
+    # versionados (ver utils/estaticos.py)
+    estaticos = Manifesto(app.static_folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        return estaticos.servir(path)
+
+    return app
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Cria ou atualiza as tabelas e índices e o usuário admin padrão."""
+    from src.models.schema import inicializar_banco
+    inicializar_banco()
+    print("Banco de dados inicializado")
+
+@click.command('reconstruir-resumo')
+@with_appcontext
+def reconstruir_resumo_command():
+    """Recalcula a tabela de resumo diário de consultas usada pelos relatórios."""
+    from src.models.resumo import reconstruir_resumo
+    reconstruir_resumo()
+    print("Resumo diário de consultas reconstruído")
+
+@click.command('import')
+@click.argument('tipo', type=click.Choice(['pacientes', 'medicos', 'consultas']))
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@with_appcontext
+def importar_command(tipo, arquivo):
+    """Importa pacientes, médicos ou consultas de um arquivo CSV ou NDJSON."""
+    from src.models.importacao import importar, ler_registros
+    formato = 'csv' if arquivo.lower().endswith('.csv') else 'ndjson'
+    with open(arquivo, 'rb') as stream:
+        resultado = importar(tipo, ler_registros(stream, formato))
+
+    for erro in resultado['erros']:
+        print(f"Linha {erro['linha']}: {erro['error']}")
+    print(f"{resultado['inseridos']} registros importados, {len(resultado['erros'])} com erro")
+
+@click.command('arquivar-consultas')
+@click.option('--dias', type=int, default=None, help='Idade mínima das consultas (padrão: ARQUIVO_HORIZONTE_DIAS ou 365).')
+@click.option('--lote', type=int, default=None, help='Consultas movidas por transação.')
+@with_appcontext
+def arquivar_command(dias, lote):
+    """Move consultas realizadas e canceladas antigas para o arquivo."""
+    from src.models.arquivo import HORIZONTE_ARQUIVO_DIAS, TAMANHO_LOTE_ARQUIVO, arquivar
+    total = arquivar(
+        HORIZONTE_ARQUIVO_DIAS if dias is None else dias,
+        TAMANHO_LOTE_ARQUIVO if lote is None else lote
+    )
+    print(f"{total} consultas arquivadas")
+
+# App padrão, criado sob demanda: importar este módulo (para usar create_app)
+# não monta nada
+def __getattr__(nome):
+    if nome == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 
 if __name__ == '__main__':
+    app = create_app({'DEBUG': True})
+    # Em desenvolvimento, o banco local é criado/atualizado ao iniciar
+    with app.app_context():
+        from src.models.schema import inicializar_banco
+        inicializar_banco()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,167 @@
+import bisect
+import random
+import time
+from src.models.user import db
+from src.models.medico import Medico
+from src.models.paciente import Paciente
+from src.models.consulta import Consulta
+from datetime import datetime, timedelta
+from sqlalchemy import and_, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+DURACAO_PADRAO = 30
+DURACAO_MINIMA = 5
+DURACAO_MAXIMA = 240
+
+TENTATIVAS_AGENDAMENTO = 5
+ESPERA_INICIAL_SEGUNDOS = 0.05
+
+class ConflitoDeHorario(Exception):
+    pass
+
+class PacienteNaoEncontrado(Exception):
+    pass
+
+def validar_duracao(duracao):
+    try:
+        duracao = int(duracao)
+    except (TypeError, ValueError):
+        raise ValueError('duracao_minutos inválido')
+    if not DURACAO_MINIMA <= duracao <= DURACAO_MAXIMA:
+        raise ValueError(f'duracao_minutos deve estar entre {DURACAO_MINIMA} e {DURACAO_MAXIMA}')
+    return duracao
+
+def fim_consulta(consulta):
+    return consulta.data_hora + timedelta(minutes=consulta.duracao_minutos or DURACAO_PADRAO)
+
+# Consultas ativas do médico que começam em [inicio, fim), via índice (medico_id, data_hora)
+def consultas_no_intervalo(medico_id, inicio, fim, ignorar_id=None):
+    query = Consulta.query.filter(
+        and_(
+            Consulta.medico_id == medico_id,
+            Consulta.data_hora >= inicio,
+            Consulta.data_hora < fim,
+            Consulta.status != 'cancelada'
+        )
+    )
+    if ignorar_id is not None:
+        query = query.filter(Consulta.id != ignorar_id)
+    return query.order_by(Consulta.data_hora).all()
+
+# Consultas que se sobrepõem a [inicio, inicio + duracao). Como nenhuma consulta
+# dura mais que DURACAO_MAXIMA, só as que começam nessa janela antes do início
+# podem se sobrepor, o que mantém a busca como um intervalo no índice.
+def conflitos(medico_id, inicio, duracao, ignorar_id=None):
+    fim = inicio + timedelta(minutes=duracao)
+    candidatas = consultas_no_intervalo(
+        medico_id, inicio - timedelta(minutes=DURACAO_MAXIMA), fim, ignorar_id
+    )
+    return [consulta for consulta in candidatas if fim_consulta(consulta) > inicio]
+
+# Uma consulta passa a ocupar um horário (e precisa da verificação de conflito)
+# quando fica ativa e antes estava cancelada ou mudou de data/hora, duração ou médico
+def ocupa_novo_horario(status_anterior, status_novo, mudou_horario=False):
+    return status_novo != 'cancelada' and (status_anterior == 'cancelada' or mudou_horario)
+
+# Intervalos livres do médico no dia, dentro do expediente, com pelo menos
+# `duracao` minutos. Custo proporcional ao número de consultas do dia.
+def horarios_livres(medico_id, dia, inicio_expediente, fim_expediente, duracao=DURACAO_PADRAO):
+    inicio = datetime.combine(dia, inicio_expediente)
+    fim = datetime.combine(dia, fim_expediente)
+    minimo = timedelta(minutes=duracao)
+
+    livres = []
+    cursor = inicio
+    for consulta in consultas_no_intervalo(medico_id, inicio - timedelta(minutes=DURACAO_MAXIMA), fim):
+        if consulta.data_hora - cursor >= minimo:
+            livres.append((cursor, consulta.data_hora))
+        cursor = max(cursor, fim_consulta(consulta))
+    if fim - cursor >= minimo:
+        livres.append((cursor, fim))
+    return livres
+
+# Agenda em memória de um médico (inícios ordenados), usada para checar muitas
+# consultas de uma vez, como na importação em lote
+class Agenda:
+    def __init__(self):
+        self.inicios = []
+        self.fins = []
+
+    def adicionar(self, inicio, duracao):
+        posicao = bisect.bisect_right(self.inicios, inicio)
+        self.inicios.insert(posicao, inicio)
+        self.fins.insert(posicao, inicio + timedelta(minutes=duracao))
+
+    def sobrepoe(self, inicio, duracao):
+        fim = inicio + timedelta(minutes=duracao)
+        primeiro = bisect.bisect_right(self.inicios, inicio - timedelta(minutes=DURACAO_MAXIMA))
+        ultimo = bisect.bisect_left(self.inicios, fim)
+        return any(self.fins[i] > inicio for i in range(primeiro, ultimo))
+
+# No SQLite, reserva o lock de escrita do banco já no início da transação
+# (BEGIN IMMEDIATE), antes de qualquer leitura que decida uma escrita. Deve ser
+# chamada antes de qualquer INSERT/UPDATE/DELETE da sessão.
+def reservar_escrita():
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text('BEGIN IMMEDIATE'))
+
+# Serializa agendamentos concorrentes do mesmo médico até o commit: lock de
+# escrita no SQLite, lock da linha do médico (SELECT ... FOR UPDATE) no PostgreSQL
+def bloquear_agenda(medico_id):
+    if db.engine.dialect.name == 'sqlite':
+        reservar_escrita()
+    else:
+        db.session.query(Medico.id).filter(Medico.id == medico_id).with_for_update().first()
+
+# Impede agendamentos para o paciente até o commit da sua exclusão: lock de
+# escrita no SQLite, lock da linha do paciente (SELECT ... FOR UPDATE) no
+# PostgreSQL, que paciente_existe espera
+def bloquear_paciente(paciente_id):
+    if db.engine.dialect.name == 'sqlite':
+        reservar_escrita()
+    else:
+        db.session.query(Paciente.id).filter(Paciente.id == paciente_id).with_for_update().first()
+
+# Confirma, dentro de `agendar`, que o paciente ainda existe. No PostgreSQL o
+# FOR KEY SHARE espera uma exclusão em andamento (e impede uma nova até o
+# commit); no SQLite a agenda bloqueada já serializa com a exclusão
+def paciente_existe(paciente_id):
+    return db.session.query(Paciente.id).filter(
+        Paciente.id == paciente_id
+    ).with_for_update(read=True, key_share=True).first() is not None
+
+# Violação do índice único parcial de horário. O PostgreSQL informa o nome do
+# índice; o SQLite, as colunas (nenhum outro índice único as tem nessa ordem).
+def _violacao_de_horario(erro):
+    mensagem = str(erro.orig)
+    return 'ux_consultas_medico_horario_ativo' in mensagem or 'consultas.medico_id, consultas.data_hora' in mensagem
+
+def _erro_de_concorrencia(erro):
+    mensagem = str(erro.orig).lower()
+    return 'database is locked' in mensagem or 'could not serialize' in mensagem or 'deadlock' in mensagem
+
+# Executa `operacao` (verificação de conflito + escrita) com a agenda do médico
+# bloqueada e faz o commit. Lock ocupado é tentado de novo com espera
+# exponencial; violação do índice único parcial vira ConflitoDeHorario (as
+# demais violações de integridade são propagadas). ConflitoDeHorario e
+# PacienteNaoEncontrado levantados por `operacao` desfazem a transação.
+def agendar(medico_id, operacao):
+    for tentativa in range(TENTATIVAS_AGENDAMENTO):
+        try:
+            bloquear_agenda(medico_id)
+            resultado = operacao()
+            db.session.commit()
+            return resultado
+        except (ConflitoDeHorario, PacienteNaoEncontrado):
+            db.session.rollback()
+            raise
+        except IntegrityError as e:
+            db.session.rollback()
+            if not _violacao_de_horario(e):
+                raise
+            raise ConflitoDeHorario()
+        except OperationalError as e:
+            db.session.rollback()
+            if not _erro_de_concorrencia(e) or tentativa == TENTATIVAS_AGENDAMENTO - 1:
+                raise
+            time.sleep(ESPERA_INICIAL_SEGUNDOS * 2 ** tentativa * (1 + random.random()))
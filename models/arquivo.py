@@ -0,0 +1,152 @@
+import os
+from src.models.user import db
+from src.models.paciente import Paciente
+from src.models.medico import Medico
+from src.models.consulta import Consulta
+from src.models.versao import incrementar_versoes
+from src.models.agenda import reservar_escrita
+from src.utils.cache import marcar_tabelas_alteradas
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import joinedload
+from src.models.serializacao import serializador_do_modelo
+
+# Arquivo das consultas antigas: as realizadas e canceladas com mais de
+# ARQUIVO_HORIZONTE_DIAS dias saem de `consultas` para `consultas_arquivo`
+# (mesmas colunas e ids), para que os índices e varreduras das rotas do dia a
+# dia não cresçam com o histórico da clínica. O job roda pelo comando
+# `flask arquivar-consultas`, em lotes (ex.: uma vez por noite, via cron).
+#
+# - Relatórios: o resumo diário não muda ao arquivar, então continua contando
+#   as consultas arquivadas; o total por paciente (pacientes frequentes) fica
+#   em consultas_arquivo_por_paciente.
+# - GET /api/consultas, /consultas/stream e /consultas/export.csv só consultam
+#   o arquivo quando o período pedido chega à data da consulta arquivada mais
+#   recente; GET /api/consultas/<id> procura no arquivo se não achar.
+# - Consultas arquivadas são somente leitura: PUT/PATCH/DELETE não as
+#   encontram, como a um id inexistente.
+
+HORIZONTE_ARQUIVO_DIAS = int(os.environ.get('ARQUIVO_HORIZONTE_DIAS', 365))
+TAMANHO_LOTE_ARQUIVO = 5000
+STATUS_ARQUIVAVEIS = ('realizada', 'cancelada')
+
+class ConsultaArquivada(db.Model):
+    __tablename__ = 'consultas_arquivo'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    medico_id = db.Column(db.Integer, db.ForeignKey('medicos.id'), nullable=False)
+    data_hora = db.Column(db.DateTime, nullable=False)
+    duracao_minutos = db.Column(db.Integer, nullable=False, default=30, server_default='30')
+    tipo_consulta = db.Column(db.String(50), nullable=False)
+    observacoes = db.Column(db.Text)
+    status = db.Column(db.String(20))
+    data_cadastro = db.Column(db.DateTime)
+    arquivado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_consultas_arquivo_data_hora', 'data_hora'),
+        db.Index('ix_consultas_arquivo_medico_data_hora', 'medico_id', 'data_hora'),
+        db.Index('ix_consultas_arquivo_paciente_data_hora', 'paciente_id', 'data_hora'),
+    )
+
+    paciente = db.relationship(Paciente)
+    medico = db.relationship(Medico)
+
+    def __repr__(self):
+        return f'<ConsultaArquivada {self.id} - Paciente: {self.paciente_id} - Médico: {self.medico_id}>'
+
+    @classmethod
+    def query_com_nomes(cls):
+        return cls.query.options(
+            joinedload(cls.paciente).load_only(Paciente.nome),
+            joinedload(cls.medico).load_only(Medico.nome)
+        )
+
+    def to_dict(self):
+        return serializar_consultas_arquivadas(self)
+
+# Mesmo formato de Consulta.to_dict
+serializar_consultas_arquivadas = serializador_do_modelo(ConsultaArquivada, excluir=('arquivado_em',), extras={
+    'paciente_nome': '(obj.paciente.nome if obj.paciente else None)',
+    'medico_nome': '(obj.medico.nome if obj.medico else None)'
+})
+
+class ConsultasArquivadasPorPaciente(db.Model):
+    __tablename__ = 'consultas_arquivo_por_paciente'
+
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ConsultasArquivadasPorPaciente {self.paciente_id}: {self.total}>'
+
+# Data da consulta arquivada mais recente (None com o arquivo vazio). Pelo
+# índice de data_hora, é uma leitura só.
+def data_limite_arquivo():
+    return db.session.query(func.max(ConsultaArquivada.data_hora)).scalar()
+
+# As consultas arquivadas mantêm o id, então a tabela consultas não pode
+# reutilizar ids. No PostgreSQL a sequência já garante isso; no SQLite, só o
+# AUTOINCREMENT (bancos antigos são recriados por `flask init-db`, ver
+# schema.recriar_consultas_com_autoincrement).
+def ids_de_consultas_monotonicos(conn):
+    if conn.dialect.name != 'sqlite':
+        return True
+    definicao = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'consultas'")
+    ).scalar()
+    return definicao is not None and 'AUTOINCREMENT' in definicao.upper()
+
+def _somar_por_paciente(conn, paciente_id, delta):
+    tabela = ConsultasArquivadasPorPaciente.__table__
+    resultado = conn.execute(
+        tabela.update().where(tabela.c.paciente_id == paciente_id).values(total=tabela.c.total + delta)
+    )
+    if resultado.rowcount == 0:
+        conn.execute(tabela.insert().values(paciente_id=paciente_id, total=delta))
+
+def _arquivar_lote(ids):
+    conn = db.session.connection()
+    consultas = Consulta.__table__
+    condicao = consultas.c.id.in_(ids)
+    colunas = [coluna.name for coluna in consultas.columns]
+
+    conn.execute(
+        ConsultaArquivada.__table__.insert().from_select(colunas, select(*consultas.columns).where(condicao))
+    )
+    por_paciente = conn.execute(
+        select(consultas.c.paciente_id, func.count()).where(condicao).group_by(consultas.c.paciente_id)
+    ).all()
+    for paciente_id, total in por_paciente:
+        _somar_por_paciente(conn, paciente_id, total)
+    conn.execute(consultas.delete().where(condicao))
+
+    incrementar_versoes(conn, 'consultas')
+    marcar_tabelas_alteradas(db.session, 'consultas')
+
+# Move as consultas elegíveis em transações de até `tamanho_lote` linhas e
+# devolve quantas foram arquivadas
+def arquivar(horizonte_dias=HORIZONTE_ARQUIVO_DIAS, tamanho_lote=TAMANHO_LOTE_ARQUIVO):
+    limite = datetime.now() - timedelta(days=horizonte_dias)
+    monotonicos = ids_de_consultas_monotonicos(db.session.connection())
+    db.session.rollback()
+    if not monotonicos:
+        raise RuntimeError('A tabela consultas reutiliza ids: execute `flask init-db` antes de arquivar')
+
+    total = 0
+    while True:
+        reservar_escrita()
+        ids = [
+            id for (id,) in db.session.query(Consulta.id).filter(
+                Consulta.data_hora < limite,
+                Consulta.status.in_(STATUS_ARQUIVAVEIS)
+            ).order_by(Consulta.id).limit(tamanho_lote)
+        ]
+        if not ids:
+            db.session.rollback()
+            return total
+
+        _arquivar_lote(ids)
+        db.session.commit()
+        total += len(ids)
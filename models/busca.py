@@ -0,0 +1,134 @@
+import re
+from src.models.user import db
+from sqlalchemy import Integer, text
+
+# Índices de texto completo (SQLite FTS5) para as buscas de pacientes e médicos.
+# O tokenizer unicode61 com remove_diacritics ignora acentos e caixa
+# ("joao" encontra "João"); CPF e CRM são indexados como digitados e também
+# sem pontuação, para que buscas parciais por número funcionem nos dois formatos.
+def compactar(coluna):
+    return f"replace(replace(replace({coluna}, '.', ''), '-', ''), '/', '')"
+
+def documento(coluna):
+    return f"{coluna} || ' ' || {compactar(coluna)}"
+
+INDICES_BUSCA = {
+    'pacientes': {
+        'fts': 'pacientes_fts',
+        'colunas': {
+            'nome': "new.nome",
+            'documento': documento('new.cpf'),
+        },
+    },
+    'medicos': {
+        'fts': 'medicos_fts',
+        'colunas': {
+            'nome': "new.nome",
+            'documento': documento('new.crm'),
+            'especialidade': "new.especialidade",
+        },
+    },
+}
+
+# CPF e CRM só com os dígitos (e letras do CRM), com tokenizer trigram: o
+# LIKE '%trecho%' usa o índice e casa qualquer trecho do número, não só o
+# início de cada palavra como os índices acima (ver buscar_ids)
+INDICES_DOCUMENTO = {
+    'pacientes': {
+        'fts': 'pacientes_documento_fts',
+        'tokenizer': 'trigram',
+        'colunas': {'digitos': compactar('new.cpf')},
+    },
+    'medicos': {
+        'fts': 'medicos_documento_fts',
+        'tokenizer': 'trigram',
+        'colunas': {'digitos': compactar('new.crm')},
+    },
+}
+
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+# O tokenizer trigram requer SQLite 3.34+
+def fts_disponivel():
+    return db.engine.dialect.name == 'sqlite' and db.engine.dialect.dbapi.sqlite_version_info >= (3, 34)
+
+def _ddl_indice(tabela, config):
+    fts = config['fts']
+    colunas = ', '.join(config['colunas'])
+    valores = ', '.join(config['colunas'].values())
+    valores_select = ', '.join(
+        expressao.replace('new.', '') for expressao in config['colunas'].values()
+    )
+    atribuicoes = ', '.join(
+        f'{coluna} = {expressao}' for coluna, expressao in config['colunas'].items()
+    )
+    return {
+        'tabela': f"CREATE VIRTUAL TABLE {fts} USING fts5({colunas}, tokenize = '{config.get('tokenizer', TOKENIZER)}')",
+        'popular': f"INSERT INTO {fts} (rowid, {colunas}) SELECT id, {valores_select} FROM {tabela}",
+        'gatilhos': [
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+            f"INSERT INTO {fts} (rowid, {colunas}) VALUES (new.id, {valores}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabela} BEGIN "
+            f"UPDATE {fts} SET {atribuicoes} WHERE rowid = old.id; END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.id; END",
+        ],
+    }
+
+# Cria (e popula na primeira vez) os índices FTS e os gatilhos de sincronização
+def criar_indices_busca():
+    if not fts_disponivel():
+        return
+
+    with db.engine.begin() as conn:
+        for tabela, config in [*INDICES_BUSCA.items(), *INDICES_DOCUMENTO.items()]:
+            ddl = _ddl_indice(tabela, config)
+            existe = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                {'nome': config['fts']}
+            ).first()
+            if not existe:
+                conn.execute(text(ddl['tabela']))
+                conn.execute(text(ddl['popular']))
+            for gatilho in ddl['gatilhos']:
+                conn.execute(text(gatilho))
+
+# Converte o termo digitado em uma consulta FTS5 de prefixos: cada palavra
+# vira "palavra"* e todas precisam estar presentes. Pontuação antes de dígitos
+# (123.456-7) é removida para casar com a forma compacta do documento.
+def montar_consulta_fts(termo):
+    palavras = re.findall(r'\w+', re.sub(r'(?<=\w)[.\-/](?=\d)', '', termo))
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+# Termo só com dígitos e pontuação de documento (ex.: 456.01)
+TERMO_NUMERICO = re.compile(r'[\d.\-/ ]*\d[\d.\-/ ]*')
+
+# Retorna os ids da tabela que casam com o termo, ordenados por relevância (bm25).
+# Termos numéricos são trechos de CPF/CRM, inclusive do meio do número (456.01
+# em 123.456.019-00): buscados nos dígitos do documento, ordenados por id
+def buscar_ids(tabela, termo, limite):
+    if TERMO_NUMERICO.fullmatch(termo.strip()):
+        fts = INDICES_DOCUMENTO[tabela]['fts']
+        resultado = db.session.execute(
+            text(f"SELECT rowid FROM {fts} WHERE digitos LIKE :padrao ORDER BY rowid LIMIT :limite").columns(rowid=Integer),
+            {'padrao': '%' + re.sub(r'\D', '', termo) + '%', 'limite': limite}
+        )
+        return [id for (id,) in resultado]
+
+    consulta = montar_consulta_fts(termo)
+    if not consulta:
+        return []
+
+    fts = INDICES_BUSCA[tabela]['fts']
+    resultado = db.session.execute(
+        text(f"SELECT rowid FROM {fts} WHERE {fts} MATCH :consulta ORDER BY rank LIMIT :limite").columns(rowid=Integer),
+        {'consulta': consulta, 'limite': limite}
+    )
+    return [id for (id,) in resultado]
+
+# Carrega as entidades dos ids mantendo a ordem de relevância
+def carregar_em_ordem(modelo, ids):
+    if not ids:
+        return []
+    por_id = {obj.id: obj for obj in modelo.query.filter(modelo.id.in_(ids))}
+    return [por_id[id] for id in ids if id in por_id]
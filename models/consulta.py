@@ -1,5 +1,9 @@
 from src.models.user import db
+from src.models.paciente import Paciente
+from src.models.medico import Medico
 from datetime import datetime
+from sqlalchemy.orm import joinedload
+from src.models.serializacao import serializador_do_modelo
 
 class Consulta(db.Model):
     __tablename__ = 'consultas'
@@ -8,25 +12,46 @@ class Consulta(db.Model):
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
     medico_id = db.Column(db.Integer, db.ForeignKey('medicos.id'), nullable=False)
     data_hora = db.Column(db.DateTime, nullable=False)
+    duracao_minutos = db.Column(db.Integer, nullable=False, default=30, server_default='30')
     tipo_consulta = db.Column(db.String(50), nullable=False)  # consulta, retorno, emergência
     observacoes = db.Column(db.Text)
     status = db.Column(db.String(20), default='agendada')  # agendada, realizada, cancelada
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Índices dos filtros mais usados (listagem, conflito de horário e relatórios)
+    __table_args__ = (
+        db.Index('ix_consultas_data_hora', 'data_hora'),
+        db.Index('ix_consultas_medico_data_hora', 'medico_id', 'data_hora'),
+        db.Index('ix_consultas_paciente_data_hora', 'paciente_id', 'data_hora'),
+        db.Index('ix_consultas_status_data_hora', 'status', 'data_hora'),
+        # Impede duas consultas ativas do mesmo médico no mesmo horário, mesmo
+        # com vários workers agendando ao mesmo tempo
+        db.Index(
+            'ux_consultas_medico_horario_ativo', 'medico_id', 'data_hora',
+            unique=True,
+            sqlite_where=db.text("status != 'cancelada'"),
+            postgresql_where=db.text("status <> 'cancelada'")
+        ),
+        # Ids nunca reutilizados no SQLite: o arquivo (models/arquivo.py) guarda
+        # os ids originais das consultas arquivadas
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<Consulta {self.id} - Paciente: {self.paciente_id} - Médico: {self.medico_id}>'
 
+    @classmethod
+    def query_com_nomes(cls):
+        # Carrega o nome do paciente e do médico na mesma query (evita N+1 no to_dict)
+        return cls.query.options(
+            joinedload(cls.paciente).load_only(Paciente.nome),
+            joinedload(cls.medico).load_only(Medico.nome)
+        )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'paciente_id': self.paciente_id,
-            'medico_id': self.medico_id,
-            'data_hora': self.data_hora.isoformat() if self.data_hora else None,
-            'tipo_consulta': self.tipo_consulta,
-            'observacoes': self.observacoes,
-            'status': self.status,
-            'data_cadastro': self.data_cadastro.isoformat() if self.data_cadastro else None,
-            'paciente_nome': self.paciente.nome if self.paciente else None,
-            'medico_nome': self.medico.nome if self.medico else None
-        }
+        return serializar_consultas(self)
 
+serializar_consultas = serializador_do_modelo(Consulta, extras={
+    'paciente_nome': '(obj.paciente.nome if obj.paciente else None)',
+    'medico_nome': '(obj.medico.nome if obj.medico else None)'
+})
@@ -0,0 +1,93 @@
+from src.models.user import db
+from src.models.consulta import Consulta
+from src.models.arquivo import ConsultaArquivada, ConsultasArquivadasPorPaciente
+from src.models.resumo import ResumoConsultaDiario
+from src.models.versao import incrementar_versoes
+from src.models.agenda import reservar_escrita, bloquear_paciente
+from src.utils.cache import marcar_tabelas_alteradas
+from sqlalchemy import and_, bindparam, func, select, union_all
+
+# Exclusão de pacientes e médicos junto com as suas consultas (inclusive as
+# arquivadas), por instruções de conjunto: o número de comandos SQL não
+# depende de quantas consultas a pessoa tem. (Com db.session.delete, o ORM
+# carregaria cada Consulta para anular a FK, que é NOT NULL, e a exclusão
+# falharia.)
+#
+# O cascade é feito aqui, e não com ON DELETE CASCADE no banco, porque o resumo
+# diário, as versões das tabelas e os caches precisam acompanhar as consultas
+# removidas; além disso o SQLite só aplica FKs com PRAGMA foreign_keys e não
+# altera as FKs de tabelas já criadas. O chamador faz o commit.
+
+MODELOS_CONSULTA = (Consulta, ConsultaArquivada)
+
+# Desconta do resumo diário as consultas (ativas e arquivadas) com
+# `coluna` == `valor`: um SELECT agregado por (dia, médico, status) e um único
+# UPDATE em lote pela PK
+def _descontar_do_resumo(coluna, valor):
+    todas = union_all(*[
+        select(func.date(modelo.data_hora, type_=db.Date).label('dia'), modelo.medico_id, modelo.status)
+        .where(getattr(modelo, coluna) == valor)
+        for modelo in MODELOS_CONSULTA
+    ]).subquery()
+    grupos = db.session.execute(
+        select(todas.c.dia, todas.c.medico_id, todas.c.status, func.count())
+        .group_by(todas.c.dia, todas.c.medico_id, todas.c.status)
+    ).all()
+    if not grupos:
+        return
+
+    resumo = ResumoConsultaDiario.__table__
+    db.session.execute(
+        resumo.update()
+        .where(and_(
+            resumo.c.dia == bindparam('b_dia'),
+            resumo.c.medico_id == bindparam('b_medico_id'),
+            resumo.c.status == bindparam('b_status')
+        ))
+        .values(total=resumo.c.total - bindparam('b_total')),
+        [
+            {'b_dia': dia, 'b_medico_id': medico_id, 'b_status': status, 'b_total': total}
+            for dia, medico_id, status, total in grupos
+        ]
+    )
+
+def _excluir_consultas(coluna, valor):
+    for modelo in MODELOS_CONSULTA:
+        tabela = modelo.__table__
+        db.session.execute(tabela.delete().where(tabela.c[coluna] == valor))
+    incrementar_versoes(db.session.connection(), 'consultas')
+    marcar_tabelas_alteradas(db.session, 'consultas')
+
+def excluir_paciente(paciente):
+    # Bloqueia agendamentos concorrentes para o paciente até o commit
+    bloquear_paciente(paciente.id)
+    _descontar_do_resumo('paciente_id', paciente.id)
+    _excluir_consultas('paciente_id', paciente.id)
+    por_paciente = ConsultasArquivadasPorPaciente.__table__
+    db.session.execute(por_paciente.delete().where(por_paciente.c.paciente_id == paciente.id))
+    db.session.delete(paciente)
+
+def excluir_medico(medico):
+    reservar_escrita()
+    # Todas as consultas do médico saem, então as linhas dele no resumo também
+    resumo = ResumoConsultaDiario.__table__
+    db.session.execute(resumo.delete().where(resumo.c.medico_id == medico.id))
+
+    # Totais arquivados dos pacientes atendidos por ele: um SELECT agregado e
+    # um UPDATE em lote
+    grupos = db.session.execute(
+        select(ConsultaArquivada.paciente_id, func.count())
+        .where(ConsultaArquivada.medico_id == medico.id)
+        .group_by(ConsultaArquivada.paciente_id)
+    ).all()
+    if grupos:
+        por_paciente = ConsultasArquivadasPorPaciente.__table__
+        db.session.execute(
+            por_paciente.update()
+            .where(por_paciente.c.paciente_id == bindparam('b_paciente_id'))
+            .values(total=por_paciente.c.total - bindparam('b_total')),
+            [{'b_paciente_id': paciente_id, 'b_total': total} for paciente_id, total in grupos]
+        )
+
+    _excluir_consultas('medico_id', medico.id)
+    db.session.delete(medico)
@@ -0,0 +1,240 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from src.models.user import db
+from src.models.paciente import Paciente
+from src.models.medico import Medico
+from src.models.consulta import Consulta
+from src.models.resumo import aplicar_delta
+from src.models.versao import incrementar_versoes
+from src.models.agenda import Agenda, DURACAO_PADRAO, DURACAO_MAXIMA, validar_duracao, reservar_escrita
+from src.utils.cache import invalidar_tabelas
+from sqlalchemy import and_
+
+TAMANHO_LOTE_IMPORTACAO = 5000
+
+class ErroImportacao(ValueError):
+    pass
+
+# Leitura das linhas de entrada (NDJSON ou CSV), numeradas a partir de 1
+def ler_ndjson(arquivo):
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            yield numero, json.loads(linha)
+        except ValueError as e:
+            yield numero, ErroImportacao(f'JSON inválido: {e}')
+
+def ler_csv(arquivo):
+    # Linha 1 é o cabeçalho
+    for numero, registro in enumerate(csv.DictReader(arquivo), start=2):
+        yield numero, {campo: valor for campo, valor in registro.items() if valor != ''}
+
+# Escolhe o leitor pelo formato ('csv' / 'text/csv' ou NDJSON) a partir de um
+# stream binário, como o corpo da requisição
+def ler_registros(stream, formato):
+    arquivo = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if formato in ('csv', 'text/csv'):
+        return ler_csv(arquivo)
+    return ler_ndjson(arquivo)
+
+def _obrigatorios(registro, campos):
+    for campo in campos:
+        if not registro.get(campo):
+            raise ErroImportacao(f'{campo} é obrigatório')
+
+# fromisoformat é bem mais rápido que strptime e aceita os formatos das rotas
+# (YYYY-MM-DD e YYYY-MM-DDTHH:MM)
+def _data(valor, tipo):
+    try:
+        return tipo.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ErroImportacao(f'Data inválida: {valor}')
+
+def _duracao(registro):
+    try:
+        return validar_duracao(registro.get('duracao_minutos', DURACAO_PADRAO))
+    except (TypeError, ValueError) as e:
+        raise ErroImportacao(str(e))
+
+def _inteiro(registro, campo):
+    try:
+        return int(registro[campo])
+    except (TypeError, ValueError):
+        raise ErroImportacao(f'{campo} inválido')
+
+# Cada tipo converte um lote de registros em linhas para INSERT, aplicando as
+# mesmas validações das rotas individuais. As verificações de unicidade e de
+# existência são feitas com uma query por lote (IN), não uma por linha.
+def _validar_pacientes(lote, erros):
+    validos = []
+    for numero, registro in lote:
+        try:
+            _obrigatorios(registro, ['nome', 'cpf', 'data_nascimento'])
+            validos.append((numero, {
+                'nome': registro['nome'],
+                'data_nascimento': _data(registro['data_nascimento'], date),
+                'cpf': registro['cpf'],
+                'endereco': registro.get('endereco'),
+                'telefone': registro.get('telefone'),
+                'email': registro.get('email')
+            }))
+        except ErroImportacao as e:
+            erros.append({'linha': numero, 'error': str(e)})
+
+    existentes = {cpf for (cpf,) in db.session.query(Paciente.cpf).filter(
+        Paciente.cpf.in_({linha['cpf'] for _, linha in validos})
+    )}
+    return _unicos(validos, 'cpf', existentes, 'CPF já cadastrado', erros)
+
+def _validar_medicos(lote, erros):
+    validos = []
+    for numero, registro in lote:
+        try:
+            _obrigatorios(registro, ['nome', 'crm', 'especialidade'])
+            validos.append((numero, {
+                'nome': registro['nome'],
+                'crm': registro['crm'],
+                'especialidade': registro['especialidade'],
+                'telefone': registro.get('telefone'),
+                'email': registro.get('email')
+            }))
+        except ErroImportacao as e:
+            erros.append({'linha': numero, 'error': str(e)})
+
+    existentes = {crm for (crm,) in db.session.query(Medico.crm).filter(
+        Medico.crm.in_({linha['crm'] for _, linha in validos})
+    )}
+    return _unicos(validos, 'crm', existentes, 'CRM já cadastrado', erros)
+
+def _validar_consultas(lote, erros):
+    validos = []
+    for numero, registro in lote:
+        try:
+            _obrigatorios(registro, ['paciente_id', 'medico_id', 'data_hora', 'tipo_consulta'])
+            validos.append((numero, {
+                'paciente_id': _inteiro(registro, 'paciente_id'),
+                'medico_id': _inteiro(registro, 'medico_id'),
+                'data_hora': _data(registro['data_hora'], datetime),
+                'duracao_minutos': _duracao(registro),
+                'tipo_consulta': registro['tipo_consulta'],
+                'observacoes': registro.get('observacoes'),
+                'status': registro.get('status', 'agendada')
+            }))
+        except ErroImportacao as e:
+            erros.append({'linha': numero, 'error': str(e)})
+
+    if not validos:
+        return []
+
+    pacientes = {id for (id,) in db.session.query(Paciente.id).filter(
+        Paciente.id.in_({linha['paciente_id'] for _, linha in validos})
+    )}
+    medicos = {id for (id,) in db.session.query(Medico.id).filter(
+        Medico.id.in_({linha['medico_id'] for _, linha in validos})
+    )}
+    # Uma única query por lote traz as consultas ativas que podem se sobrepor
+    # às do arquivo; as sobreposições são verificadas em memória por médico
+    inicio = min(linha['data_hora'] for _, linha in validos) - timedelta(minutes=DURACAO_MAXIMA)
+    fim = max(linha['data_hora'] for _, linha in validos) + timedelta(minutes=DURACAO_MAXIMA)
+    agendas = {}
+    for consulta in Consulta.query.filter(
+        and_(
+            Consulta.medico_id.in_(medicos),
+            Consulta.data_hora >= inicio,
+            Consulta.data_hora < fim,
+            Consulta.status != 'cancelada'
+        )
+    ).order_by(Consulta.data_hora):
+        agendas.setdefault(consulta.medico_id, Agenda()).adicionar(
+            consulta.data_hora, consulta.duracao_minutos
+        )
+
+    resultado = []
+    for numero, linha in validos:
+        agenda = agendas.setdefault(linha['medico_id'], Agenda())
+        if linha['paciente_id'] not in pacientes:
+            erros.append({'linha': numero, 'error': 'Paciente não encontrado'})
+        elif linha['medico_id'] not in medicos:
+            erros.append({'linha': numero, 'error': 'Médico não encontrado'})
+        elif agenda.sobrepoe(linha['data_hora'], linha['duracao_minutos']):
+            erros.append({'linha': numero, 'error': 'Médico já possui consulta agendada neste horário'})
+        else:
+            if linha['status'] != 'cancelada':
+                agenda.adicionar(linha['data_hora'], linha['duracao_minutos'])
+            resultado.append(linha)
+    return resultado
+
+def _unicos(validos, campo, existentes, mensagem, erros):
+    resultado = []
+    for numero, linha in validos:
+        if linha[campo] in existentes:
+            erros.append({'linha': numero, 'error': mensagem})
+        else:
+            existentes.add(linha[campo])
+            resultado.append(linha)
+    return resultado
+
+# O INSERT em lote não passa pelo flush do ORM, então o resumo diário é
+# atualizado aqui com os totais agregados do lote
+def _atualizar_resumo(linhas):
+    deltas = {}
+    for linha in linhas:
+        chave = (linha['data_hora'].date(), linha['medico_id'], linha['status'])
+        deltas[chave] = deltas.get(chave, 0) + 1
+    conn = db.session.connection()
+    for (dia, medico_id, status), delta in deltas.items():
+        aplicar_delta(conn, dia, medico_id, status, delta)
+
+IMPORTADORES = {
+    'pacientes': (Paciente, _validar_pacientes),
+    'medicos': (Medico, _validar_medicos),
+    'consultas': (Consulta, _validar_consultas),
+}
+
+def _importar_lote(tipo, lote, erros):
+    modelo, validar = IMPORTADORES[tipo]
+    if tipo == 'consultas':
+        # Conflitos de horário são verificados e gravados sob o mesmo lock
+        reservar_escrita()
+    linhas = validar(lote, erros)
+    if linhas:
+        db.session.execute(modelo.__table__.insert(), linhas)
+        if tipo == 'consultas':
+            _atualizar_resumo(linhas)
+        incrementar_versoes(db.session.connection(), tipo)
+    db.session.commit()
+    return len(linhas)
+
+# Importa os registros em transações de até TAMANHO_LOTE_IMPORTACAO linhas.
+# Linhas inválidas são reportadas em 'erros' sem interromper a importação.
+def importar(tipo, registros, tamanho_lote=TAMANHO_LOTE_IMPORTACAO):
+    if tipo not in IMPORTADORES:
+        raise ErroImportacao(f'Tipo de importação inválido: {tipo}')
+
+    inseridos = 0
+    erros = []
+    lote = []
+    try:
+        for numero, registro in registros:
+            if isinstance(registro, ErroImportacao):
+                erros.append({'linha': numero, 'error': str(registro)})
+                continue
+            if not isinstance(registro, dict):
+                erros.append({'linha': numero, 'error': 'Registro deve ser um objeto JSON'})
+                continue
+            lote.append((numero, registro))
+            if len(lote) >= tamanho_lote:
+                inseridos += _importar_lote(tipo, lote, erros)
+                lote = []
+        if lote:
+            inseridos += _importar_lote(tipo, lote, erros)
+    finally:
+        if inseridos:
+            invalidar_tabelas(tipo)
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return {'inseridos': inseridos, 'erros': erros}
@@ -1,5 +1,6 @@
 from src.models.user import db
 from datetime import datetime
+from src.models.serializacao import serializador_do_modelo
 
 class Medico(db.Model):
     __tablename__ = 'medicos'
@@ -11,21 +12,20 @@ class Medico(db.Model):
     telefone = db.Column(db.String(20))
     email = db.Column(db.String(120))
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Ordenação e busca por prefixo do nome (lookup do formulário de consultas)
+    __table_args__ = (
+        db.Index('ix_medicos_nome', 'nome'),
+    )
     
-    # Relacionamento com consultas
-    consultas = db.relationship('Consulta', backref='medico', lazy=True)
+    # Relacionamento com consultas. A exclusão remove as consultas em lote (ver
+    # models/exclusao.py): passive_deletes evita que o ORM as carregue antes
+    consultas = db.relationship('Consulta', backref='medico', lazy=True, passive_deletes=True)
 
     def __repr__(self):
         return f'<Medico {self.nome} - CRM: {self.crm}>'
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'nome': self.nome,
-            'crm': self.crm,
-            'especialidade': self.especialidade,
-            'telefone': self.telefone,
-            'email': self.email,
-            'data_cadastro': self.data_cadastro.isoformat() if self.data_cadastro else None
-        }
+        return serializar_medicos(self)
 
+serializar_medicos = serializador_do_modelo(Medico)
@@ -1,5 +1,6 @@
 from src.models.user import db
 from datetime import datetime
+from src.models.serializacao import serializador_do_modelo
 
 class Paciente(db.Model):
     __tablename__ = 'pacientes'
@@ -12,22 +13,20 @@ class Paciente(db.Model):
     telefone = db.Column(db.String(20))
     email = db.Column(db.String(120))
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Ordenação e busca por prefixo do nome (lookup do formulário de consultas)
+    __table_args__ = (
+        db.Index('ix_pacientes_nome', 'nome'),
+    )
     
-    # Relacionamento com consultas
-    consultas = db.relationship('Consulta', backref='paciente', lazy=True)
+    # Relacionamento com consultas. A exclusão remove as consultas em lote (ver
+    # models/exclusao.py): passive_deletes evita que o ORM as carregue antes
+    consultas = db.relationship('Consulta', backref='paciente', lazy=True, passive_deletes=True)
 
     def __repr__(self):
         return f'<Paciente {self.nome}>'
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'nome': self.nome,
-            'data_nascimento': self.data_nascimento.isoformat() if self.data_nascimento else None,
-            'cpf': self.cpf,
-            'endereco': self.endereco,
-            'telefone': self.telefone,
-            'email': self.email,
-            'data_cadastro': self.data_cadastro.isoformat() if self.data_cadastro else None
-        }
+        return serializar_pacientes(self)
 
+serializar_pacientes = serializador_do_modelo(Paciente)
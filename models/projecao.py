@@ -0,0 +1,44 @@
+from src.models.user import db
+from src.models.serializacao import gerar_serializador
+
+# Suporte a ?fields=campo1,campo2 nas listagens: seleciona só as colunas
+# pedidas (sem hidratar entidades do ORM) e serializa as linhas diretamente.
+
+class CampoInvalido(ValueError):
+    pass
+
+# Campos públicos de um modelo: suas colunas, exceto as excluídas
+def campos_do_modelo(modelo, excluir=()):
+    return {
+        coluna.key: getattr(modelo, coluna.key)
+        for coluna in modelo.__table__.columns
+        if coluna.key not in excluir
+    }
+
+def ler_campos(valor, disponiveis):
+    if not valor:
+        return None
+    campos = list(dict.fromkeys(campo.strip() for campo in valor.split(',') if campo.strip()))
+    invalidos = [campo for campo in campos if campo not in disponiveis]
+    if invalidos:
+        raise CampoInvalido(f"Campos inválidos: {', '.join(invalidos)}")
+    return campos
+
+def query_campos(modelo, disponiveis, campos):
+    return db.session.query(
+        *[disponiveis[campo].label(campo) for campo in campos]
+    ).select_from(modelo)
+
+_serializadores = {}
+MAXIMO_SERIALIZADORES = 256
+
+# Serializador gerado (e reaproveitado) para cada combinação de campos pedida
+def serializador_campos(disponiveis, campos):
+    chave = (id(disponiveis), tuple(campos))
+    if chave not in _serializadores:
+        if len(_serializadores) >= MAXIMO_SERIALIZADORES:
+            _serializadores.clear()
+        _serializadores[chave] = gerar_serializador(
+            [(campo, disponiveis[campo].type) for campo in campos]
+        )
+    return _serializadores[chave]
@@ -0,0 +1,119 @@
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.models.user import db
+from src.models.versao import versoes
+from datetime import datetime, timedelta
+
+# Relatórios longos executados fora da requisição. Cada job guarda os
+# parâmetros normalizados (chave) e as versões das tabelas lidas no momento do
+# cálculo: um pedido repetido para o mesmo relatório reaproveita o job (em
+# andamento ou concluído) enquanto nenhuma dessas tabelas tiver mudado. Como
+# tudo fica no banco, qualquer worker responde pelo job de outro.
+
+TABELAS_RELATORIOS = ('pacientes', 'medicos', 'consultas')
+
+# Job "executando" há mais tempo que isso é considerado perdido (worker
+# reiniciado no meio) e não é mais reaproveitado
+TEMPO_MAXIMO_EXECUCAO = timedelta(minutes=10)
+RETENCAO_JOBS = timedelta(days=7)
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('RELATORIO_WORKERS', 2)),
+    thread_name_prefix='relatorio'
+)
+
+class RelatorioJob(db.Model):
+    __tablename__ = 'relatorio_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tipo = db.Column(db.String(50), nullable=False)
+    parametros = db.Column(db.Text, nullable=False)
+    chave = db.Column(db.String(255), nullable=False)
+    versoes = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente, executando, concluido, erro
+    resultado = db.Column(db.Text)
+    erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    concluido_em = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_relatorio_jobs_chave', 'chave', 'versoes'),
+    )
+
+    def __repr__(self):
+        return f'<RelatorioJob {self.id} - {self.tipo}: {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'parametros': json.loads(self.parametros),
+            'status': self.status,
+            'resultado': json.loads(self.resultado) if self.resultado is not None else None,
+            'erro': self.erro,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None
+        }
+
+def chave_job(tipo, parametros):
+    return f'{tipo}|{json.dumps(parametros, sort_keys=True)}'
+
+def versoes_atuais():
+    return ','.join(str(versao) for versao, _ in versoes(*TABELAS_RELATORIOS))
+
+def _reaproveitavel(chave, assinatura):
+    limite_execucao = datetime.utcnow() - TEMPO_MAXIMO_EXECUCAO
+    return RelatorioJob.query.filter(
+        RelatorioJob.chave == chave,
+        RelatorioJob.versoes == assinatura,
+        db.or_(
+            RelatorioJob.status == 'concluido',
+            db.and_(
+                RelatorioJob.status.in_(('pendente', 'executando')),
+                RelatorioJob.criado_em >= limite_execucao
+            )
+        )
+    ).order_by(RelatorioJob.criado_em.desc()).first()
+
+def _executar(app, job_id, calcular, parametros):
+    with app.app_context():
+        job = db.session.get(RelatorioJob, job_id)
+        job.status = 'executando'
+        db.session.commit()
+        try:
+            # O cálculo lê da engine de leitura, como os relatórios síncronos
+            db.session.info['somente_leitura'] = True
+            resultado = app.json.dumps(calcular(**parametros))
+            db.session.info['somente_leitura'] = False
+            job.status = 'concluido'
+            job.resultado = resultado
+        except Exception as e:
+            db.session.rollback()
+            db.session.info['somente_leitura'] = False
+            job = db.session.get(RelatorioJob, job_id)
+            job.status = 'erro'
+            job.erro = str(e)
+        job.concluido_em = datetime.utcnow()
+        db.session.commit()
+
+# Devolve o job existente para os mesmos parâmetros e dados, ou cria um novo e
+# o coloca na fila do executor
+def enfileirar(app, tipo, parametros, calcular):
+    chave = chave_job(tipo, parametros)
+    assinatura = versoes_atuais()
+    job = _reaproveitavel(chave, assinatura)
+    if job:
+        return job
+
+    RelatorioJob.query.filter(
+        RelatorioJob.criado_em < datetime.utcnow() - RETENCAO_JOBS
+    ).delete(synchronize_session=False)
+    job = RelatorioJob(
+        tipo=tipo, parametros=json.dumps(parametros), chave=chave, versoes=assinatura
+    )
+    db.session.add(job)
+    db.session.commit()
+    executor.submit(_executar, app, job.id, calcular, parametros)
+    return job
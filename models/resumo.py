@@ -0,0 +1,104 @@
+from src.models.user import db
+from src.models.consulta import Consulta
+from src.models.arquivo import ConsultaArquivada, ConsultasArquivadasPorPaciente
+from sqlalchemy import event, func, inspect, and_, union_all
+from sqlalchemy.orm import Session
+
+CAMPOS_RESUMO = ('data_hora', 'medico_id', 'status')
+
+class ResumoConsultaDiario(db.Model):
+    __tablename__ = 'consultas_resumo_diario'
+
+    dia = db.Column(db.Date, primary_key=True)
+    medico_id = db.Column(db.Integer, db.ForeignKey('medicos.id'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResumoConsultaDiario {self.dia} - Médico: {self.medico_id} - {self.status}: {self.total}>'
+
+def _chave(valores):
+    return (valores['data_hora'].date(), valores['medico_id'], valores['status'])
+
+def _valores_atuais(consulta):
+    return {campo: getattr(consulta, campo) for campo in CAMPOS_RESUMO}
+
+def _valores_anteriores(consulta):
+    estado = inspect(consulta)
+    valores = {}
+    for campo in CAMPOS_RESUMO:
+        historico = estado.attrs[campo].history
+        valores[campo] = historico.deleted[0] if historico.deleted else getattr(consulta, campo)
+    return valores
+
+def aplicar_delta(conn, dia, medico_id, status, delta):
+    tabela = ResumoConsultaDiario.__table__
+    condicao = and_(
+        tabela.c.dia == dia,
+        tabela.c.medico_id == medico_id,
+        tabela.c.status == status
+    )
+    resultado = conn.execute(
+        tabela.update().where(condicao).values(total=tabela.c.total + delta)
+    )
+    if resultado.rowcount == 0:
+        conn.execute(
+            tabela.insert().values(dia=dia, medico_id=medico_id, status=status, total=delta)
+        )
+
+# Mantém o resumo diário em dia na mesma transação de cada escrita em consultas
+@event.listens_for(Session, 'after_flush')
+def atualizar_resumo(session, flush_context):
+    deltas = {}
+
+    def somar(chave, delta):
+        deltas[chave] = deltas.get(chave, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, Consulta):
+            somar(_chave(_valores_atuais(obj)), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Consulta):
+            somar(_chave(_valores_anteriores(obj)), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Consulta) and session.is_modified(obj):
+            anterior = _chave(_valores_anteriores(obj))
+            atual = _chave(_valores_atuais(obj))
+            if anterior != atual:
+                somar(anterior, -1)
+                somar(atual, 1)
+
+    if not any(deltas.values()):
+        return
+
+    conn = session.connection()
+    for (dia, medico_id, status), delta in deltas.items():
+        if delta:
+            aplicar_delta(conn, dia, medico_id, status, delta)
+
+# Recalcula todo o resumo a partir das consultas, inclusive as arquivadas, e
+# os totais arquivados por paciente
+def reconstruir_resumo():
+    tabela = ResumoConsultaDiario.__table__
+    todas = union_all(*[
+        db.select(func.date(modelo.data_hora).label('dia'), modelo.medico_id, modelo.status)
+        for modelo in (Consulta, ConsultaArquivada)
+    ]).subquery()
+    agregados = db.select(
+        todas.c.dia, todas.c.medico_id, todas.c.status, func.count()
+    ).group_by(todas.c.dia, todas.c.medico_id, todas.c.status)
+
+    db.session.execute(tabela.delete())
+    db.session.execute(
+        tabela.insert().from_select(['dia', 'medico_id', 'status', 'total'], agregados)
+    )
+
+    por_paciente = ConsultasArquivadasPorPaciente.__table__
+    db.session.execute(por_paciente.delete())
+    db.session.execute(por_paciente.insert().from_select(
+        ['paciente_id', 'total'],
+        db.select(ConsultaArquivada.paciente_id, func.count()).group_by(ConsultaArquivada.paciente_id)
+    ))
+    db.session.commit()
@@ -0,0 +1,88 @@
+from src.models.user import User, db
+from src.models.consulta import Consulta
+from src.models.resumo import ResumoConsultaDiario, reconstruir_resumo
+from src.models.arquivo import ConsultaArquivada, ids_de_consultas_monotonicos
+from src.models.busca import criar_indices_busca
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+# db.create_all() não altera tabelas existentes: colunas novas dos modelos são
+# adicionadas com ALTER TABLE (precisam de server_default se forem NOT NULL)
+def adicionar_colunas_faltantes():
+    inspetor = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existentes = {coluna['name'] for coluna in inspetor.get_columns(table.name)}
+            for coluna in table.columns:
+                if coluna.name in existentes:
+                    continue
+                definicao = CreateColumn(coluna).compile(dialect=db.engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {definicao}'))
+
+# Bancos SQLite criados antes de consultas ter AUTOINCREMENT: o SQLite não
+# altera a definição de uma tabela existente, então ela é recriada e as linhas
+# copiadas, com a sequência acima do maior id já usado (inclusive no arquivo).
+# Os índices são recriados em seguida por criar_indices_faltantes.
+def recriar_consultas_com_autoincrement():
+    with db.engine.begin() as conn:
+        if ids_de_consultas_monotonicos(conn):
+            return
+
+        tabela = Consulta.__table__
+        colunas = ', '.join(coluna.name for coluna in tabela.columns)
+        for index in tabela.indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+        conn.execute(text('ALTER TABLE consultas RENAME TO consultas_sem_autoincrement'))
+        conn.execute(CreateTable(tabela))
+        conn.execute(text(f'INSERT INTO consultas ({colunas}) SELECT {colunas} FROM consultas_sem_autoincrement'))
+        conn.execute(text('DROP TABLE consultas_sem_autoincrement'))
+
+        maior_id = max(
+            conn.execute(select(func.max(tabela.c.id))).scalar() or 0,
+            conn.execute(select(func.max(ConsultaArquivada.id))).scalar() or 0
+        )
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'consultas'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('consultas', :seq)"), {'seq': maior_id})
+
+# db.create_all() só cria tabelas inexistentes; índices novos declarados nos
+# modelos não são aplicados a bancos já existentes (ex.: database/app.db).
+# IF NOT EXISTS também cobre índices de expressão, que não são refletidos.
+# Um índice único que falhe por dados duplicados já gravados não impede a
+# inicialização: o aviso é exibido e os demais índices são criados.
+def criar_indices_faltantes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+            except IntegrityError as e:
+                print(f"Índice {index.name} não criado: {e.orig}")
+
+def atualizar_schema():
+    db.create_all()
+    adicionar_colunas_faltantes()
+    recriar_consultas_com_autoincrement()
+    criar_indices_faltantes()
+    criar_indices_busca()
+
+    # Bancos anteriores ao resumo diário: popular a partir das consultas existentes
+    if not ResumoConsultaDiario.query.first() and Consulta.query.first():
+        reconstruir_resumo()
+
+# Schema e usuário admin padrão. Executado uma vez por implantação e após
+# atualizações (flask init-db), não a cada inicialização de worker.
+def inicializar_banco():
+    atualizar_schema()
+
+    admin = User.query.filter_by(username='admin').first()
+    if not admin:
+        admin = User(
+            username='admin',
+            email='admin@sistema.com',
+            role='admin'
+        )
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+        print("Usuário admin criado: admin/admin123")
@@ -0,0 +1,34 @@
+from datetime import date
+
+# Serializadores gerados uma única vez a partir dos metadados das colunas.
+# Cada um é uma função compilada que monta o dicionário com acesso direto aos
+# atributos (funciona tanto para entidades do ORM quanto para linhas de
+# queries com colunas rotuladas), sem laços nem verificações de tipo por linha.
+
+def _eh_data(tipo):
+    try:
+        return issubclass(tipo.python_type, date)
+    except NotImplementedError:
+        return False
+
+def _expressao(nome, eh_data):
+    if eh_data:
+        return f'(obj.{nome}.isoformat() if obj.{nome} is not None else None)'
+    return f'obj.{nome}'
+
+# campos: lista de (nome, tipo SQLAlchemy); extras: nome -> expressão Python sobre `obj`
+def gerar_serializador(campos, extras=None, nome_funcao='serializar'):
+    itens = [f"'{nome}': {_expressao(nome, _eh_data(tipo))}" for nome, tipo in campos]
+    itens += [f"'{nome}': {expressao}" for nome, expressao in (extras or {}).items()]
+    codigo = f"def {nome_funcao}(obj):\n    return {{{', '.join(itens)}}}\n"
+    namespace = {}
+    exec(compile(codigo, f'<serializador {nome_funcao}>', 'exec'), namespace)
+    return namespace[nome_funcao]
+
+def serializador_do_modelo(modelo, excluir=(), extras=None):
+    campos = [
+        (coluna.key, coluna.type)
+        for coluna in modelo.__table__.columns
+        if coluna.key not in excluir
+    ]
+    return gerar_serializador(campos, extras, f'serializar_{modelo.__tablename__}')
@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from src.models.serializacao import serializador_do_modelo
+from src.models.banco import SessaoRoteada
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -14,6 +16,8 @@ class User(db.Model):
     role = db.Column(db.String(20), default='admin')  # admin, medico, recepcionista
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
     ativo = db.Column(db.Boolean, default=True)
+    # Tokens emitidos até este instante deixam de valer (logout, troca de senha)
+    tokens_revogados_em = db.Column(db.DateTime)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -24,12 +28,10 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def revogar_tokens(self):
+        self.tokens_revogados_em = datetime.utcnow()
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'role': self.role,
-            'data_cadastro': self.data_cadastro.isoformat() if self.data_cadastro else None,
-            'ativo': self.ativo
-        }
+        return serializar_users(self)
+
+serializar_users = serializador_do_modelo(User, excluir=('password_hash', 'tokens_revogados_em'))
@@ -0,0 +1,49 @@
+from src.models.user import db
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Contador de versão por tabela, incrementado na mesma transação de cada
+# escrita. Fica no banco (e não em memória) para que todos os workers vejam a
+# mesma versão; as respostas das listagens usam essas versões como ETag.
+TABELAS_VERSIONADAS = ('pacientes', 'medicos', 'consultas')
+
+class VersaoTabela(db.Model):
+    __tablename__ = 'versoes_tabelas'
+
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<VersaoTabela {self.tabela}: {self.versao}>'
+
+def incrementar_versoes(conn, *tabelas):
+    tabela_versoes = VersaoTabela.__table__
+    agora = datetime.utcnow()
+    for tabela in tabelas:
+        resultado = conn.execute(
+            tabela_versoes.update()
+            .where(tabela_versoes.c.tabela == tabela)
+            .values(versao=tabela_versoes.c.versao + 1, atualizado_em=agora)
+        )
+        if resultado.rowcount == 0:
+            conn.execute(tabela_versoes.insert().values(tabela=tabela, versao=1, atualizado_em=agora))
+
+# Versões atuais e data da última alteração de cada tabela (uma consulta pela PK)
+def versoes(*tabelas):
+    linhas = db.session.query(
+        VersaoTabela.tabela, VersaoTabela.versao, VersaoTabela.atualizado_em
+    ).filter(VersaoTabela.tabela.in_(tabelas)).all()
+    por_tabela = {tabela: (versao, atualizado_em) for tabela, versao, atualizado_em in linhas}
+    return [por_tabela.get(tabela, (0, None)) for tabela in tabelas]
+
+@event.listens_for(Session, 'after_flush')
+def registrar_versoes(session, flush_context):
+    alteradas = {
+        obj.__tablename__
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if getattr(obj, '__tablename__', None) in TABELAS_VERSIONADAS
+    }
+    if alteradas:
+        incrementar_versoes(session.connection(), *sorted(alteradas))
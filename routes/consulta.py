@@ -1,52 +1,230 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from src.models.user import db
 from src.models.consulta import Consulta
+from src.models.arquivo import ConsultaArquivada, data_limite_arquivo
+from src.models.importacao import importar, ler_registros
+from src.models.agenda import DURACAO_PADRAO, ConflitoDeHorario, PacienteNaoEncontrado, validar_duracao, conflitos, ocupa_novo_horario, agendar, paciente_existe
 from src.models.paciente import Paciente
 from src.models.medico import Medico
+from src.models.projecao import CampoInvalido, campos_do_modelo, ler_campos, query_campos, serializador_campos
+import heapq
 from datetime import datetime
 from sqlalchemy import and_, or_
+from src.utils.etag import condicional
+from src.utils.exportacao import resposta_csv
 
 consulta_bp = Blueprint('consulta', __name__)
 
+LIMITE_MAXIMO_PAGINA = 500
+TAMANHO_LOTE_STREAM = 500
+
+CAMPOS_CONSULTA = {
+    **campos_do_modelo(Consulta),
+    'paciente_nome': Paciente.nome,
+    'medico_nome': Medico.nome
+}
+
+# Mesmos campos, lidos de consultas_arquivo (ver models/arquivo.py)
+CAMPOS_ARQUIVO = {
+    **campos_do_modelo(ConsultaArquivada, excluir=('arquivado_em',)),
+    'paciente_nome': Paciente.nome,
+    'medico_nome': Medico.nome
+}
+
+# Seleciona só as colunas pedidas, com os joins necessários para os nomes
+def query_projecao(campos, modelo=Consulta):
+    disponiveis = CAMPOS_CONSULTA if modelo is Consulta else CAMPOS_ARQUIVO
+    query = query_campos(modelo, disponiveis, campos)
+    if 'paciente_nome' in campos:
+        query = query.outerjoin(Paciente, Paciente.id == modelo.paciente_id)
+    if 'medico_nome' in campos:
+        query = query.outerjoin(Medico, Medico.id == modelo.medico_id)
+    return query
+
+# Query base e serializador: entidades completas (to_dict) ou, com ?fields=,
+# apenas as colunas pedidas
+def query_e_serializador(args, modelo=Consulta):
+    campos = ler_campos(args.get('fields'), CAMPOS_CONSULTA)
+    if not campos:
+        return modelo.query_com_nomes(), modelo.to_dict
+    
+    # id e data_hora sempre são lidos, pois formam o cursor da paginação
+    query = query_projecao(list(dict.fromkeys(campos + ['id', 'data_hora'])), modelo)
+    return query, serializador_campos(CAMPOS_CONSULTA, campos)
+
+# Aplica os filtros da query string à query de consultas
+def filtrar_consultas(args, query, modelo=Consulta):
+    data_inicio = args.get('data_inicio')
+    data_fim = args.get('data_fim')
+    medico_id = args.get('medico_id')
+    paciente_id = args.get('paciente_id')
+    status = args.get('status')
+    
+    # Aplicar filtros
+    if data_inicio:
+        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+        query = query.filter(modelo.data_hora >= data_inicio)
+    
+    if data_fim:
+        data_fim = datetime.strptime(data_fim, '%Y-%m-%d')
+        query = query.filter(modelo.data_hora <= data_fim)
+    
+    if medico_id:
+        query = query.filter(modelo.medico_id == medico_id)
+    
+    if paciente_id:
+        query = query.filter(modelo.paciente_id == paciente_id)
+    
+    if status:
+        query = query.filter(modelo.status == status)
+    
+    return query
+
+def codificar_cursor(consulta):
+    return f'{consulta.data_hora.isoformat()},{consulta.id}'
+
+def decodificar_cursor(cursor):
+    data_hora, _, id = cursor.rpartition(',')
+    return datetime.fromisoformat(data_hora), int(id)
+
+def chave_ordenacao(consulta):
+    return (consulta.data_hora, consulta.id)
+
+# Consultas filtradas de `modelo`, na ordem data_hora DESC, id DESC, a partir
+# do cursor (keyset) e com limite opcionais
+def query_ordenada(args, modelo, cursor=None, limite=None):
+    query, serializar = query_e_serializador(args, modelo)
+    query = filtrar_consultas(args, query, modelo)
+    if cursor:
+        cursor_data_hora, cursor_id = cursor
+        query = query.filter(
+            or_(
+                modelo.data_hora < cursor_data_hora,
+                and_(
+                    modelo.data_hora == cursor_data_hora,
+                    modelo.id < cursor_id
+                )
+            )
+        )
+    query = query.order_by(modelo.data_hora.desc(), modelo.id.desc())
+    if limite:
+        query = query.limit(limite)
+    return query, serializar
+
+# Data da consulta arquivada mais recente, se o período pedido chega ao
+# arquivo; None se basta a tabela consultas
+def limite_arquivo_alcancado(args):
+    limite = data_limite_arquivo()
+    if limite is None:
+        return None
+    data_inicio = args.get('data_inicio')
+    if data_inicio and datetime.strptime(data_inicio, '%Y-%m-%d') > limite:
+        return None
+    return limite
+
+# Consultas ativas seguidas das arquivadas, intercaladas na ordem da listagem
+def consultas_com_arquivo(args):
+    query, serializar = query_ordenada(args, Consulta)
+    if limite_arquivo_alcancado(args) is None:
+        return query.yield_per(TAMANHO_LOTE_STREAM), serializar
+    arquivadas, _ = query_ordenada(args, ConsultaArquivada)
+    return heapq.merge(
+        query.yield_per(TAMANHO_LOTE_STREAM), arquivadas.yield_per(TAMANHO_LOTE_STREAM),
+        key=chave_ordenacao, reverse=True
+    ), serializar
+
 @consulta_bp.route('/consultas', methods=['GET'])
+@condicional('consultas', 'pacientes', 'medicos')
 def listar_consultas():
     try:
-        # Parâmetros de filtro
-        data_inicio = request.args.get('data_inicio')
-        data_fim = request.args.get('data_fim')
-        medico_id = request.args.get('medico_id')
-        paciente_id = request.args.get('paciente_id')
-        status = request.args.get('status')
+        limite = request.args.get('limit', type=int)
+        after = request.args.get('after')
         
-        query = Consulta.query
+        # Sem paginação: mantém o formato original (lista completa)
+        if not limite and not after:
+            consultas, serializar = consultas_com_arquivo(request.args)
+            return jsonify([serializar(consulta) for consulta in consultas]), 200
         
-        # Aplicar filtros
-        if data_inicio:
-            data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-            query = query.filter(Consulta.data_hora >= data_inicio)
+        limite = min(max(limite or LIMITE_MAXIMO_PAGINA, 1), LIMITE_MAXIMO_PAGINA)
         
-        if data_fim:
-            data_fim = datetime.strptime(data_fim, '%Y-%m-%d')
-            query = query.filter(Consulta.data_hora <= data_fim)
+        # Paginação por cursor (keyset) sobre a ordenação data_hora DESC, id DESC
+        cursor = None
+        if after:
+            try:
+                cursor = decodificar_cursor(after)
+            except ValueError:
+                return jsonify({'error': 'Cursor inválido'}), 400
         
-        if medico_id:
-            query = query.filter(Consulta.medico_id == medico_id)
+        query, serializar = query_ordenada(request.args, Consulta, cursor, limite + 1)
+        consultas = query.all()
         
-        if paciente_id:
-            query = query.filter(Consulta.paciente_id == paciente_id)
+        # O arquivo só tem consultas até a data limite: se a página já está
+        # cheia com consultas mais recentes, ele não é lido
+        limite_arquivo = limite_arquivo_alcancado(request.args)
+        if limite_arquivo and (len(consultas) <= limite or consultas[-1].data_hora <= limite_arquivo):
+            arquivadas, _ = query_ordenada(request.args, ConsultaArquivada, cursor, limite + 1)
+            consultas = sorted(consultas + arquivadas.all(), key=chave_ordenacao, reverse=True)[:limite + 1]
         
-        if status:
-            query = query.filter(Consulta.status == status)
+        tem_mais = len(consultas) > limite
+        consultas = consultas[:limite]
         
-        consultas = query.order_by(Consulta.data_hora.desc()).all()
-        return jsonify([consulta.to_dict() for consulta in consultas]), 200
+        return jsonify({
+            'consultas': [serializar(consulta) for consulta in consultas],
+            'proximo_cursor': codificar_cursor(consultas[-1]) if tem_mais else None
+        }), 200
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@consulta_bp.route('/consultas/stream', methods=['GET'])
+def stream_consultas():
+    try:
+        consultas, serializar = consultas_com_arquivo(request.args)
+        
+        # Gera uma linha JSON por consulta (NDJSON), lendo o banco em lotes
+        codificar = current_app.json.dumps
+        def gerar():
+            for consulta in consultas:
+                yield codificar(serializar(consulta)) + '\n'
+        
+        return Response(stream_with_context(gerar()), mimetype='application/x-ndjson'), 200
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# CSV com todas as consultas filtradas (ou só as colunas de ?fields=), lido do
+# banco em lotes e escrito na resposta conforme é lido
+@consulta_bp.route('/consultas/export.csv', methods=['GET'])
+def exportar_consultas():
+    try:
+        campos = ler_campos(request.args.get('fields'), CAMPOS_CONSULTA) or list(CAMPOS_CONSULTA)
+        # id e data_hora sempre são lidos (depois dos pedidos), pois ordenam a
+        # intercalação com o arquivo; o CSV recebe só as colunas pedidas
+        selecionados = campos + [campo for campo in ('id', 'data_hora') if campo not in campos]
+        consultas = filtrar_consultas(request.args, query_projecao(selecionados)).order_by(
+            Consulta.data_hora.desc(), Consulta.id.desc()
+        ).yield_per(TAMANHO_LOTE_STREAM)
+        if limite_arquivo_alcancado(request.args):
+            arquivadas = filtrar_consultas(
+                request.args, query_projecao(selecionados, ConsultaArquivada), ConsultaArquivada
+            ).order_by(ConsultaArquivada.data_hora.desc(), ConsultaArquivada.id.desc())
+            consultas = heapq.merge(
+                consultas, arquivadas.yield_per(TAMANHO_LOTE_STREAM), key=chave_ordenacao, reverse=True
+            )
+        linhas = (consulta[:len(campos)] for consulta in consultas)
+        return resposta_csv('consultas.csv', campos, linhas), 200
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @consulta_bp.route('/consultas/<int:id>', methods=['GET'])
 def obter_consulta(id):
     try:
-        consulta = Consulta.query.get_or_404(id)
+        # Consultas arquivadas continuam acessíveis pelo id
+        consulta = Consulta.query_com_nomes().get(id) or ConsultaArquivada.query_com_nomes().get_or_404(id)
         return jsonify(consulta.to_dict()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 404
@@ -74,29 +252,38 @@ def criar_consulta():
         # Converter data e hora
         data_hora = datetime.strptime(data['data_hora'], '%Y-%m-%dT%H:%M')
         
-        # Verificar conflito de horário para o médico
-        conflito = Consulta.query.filter(
-            and_(
-                Consulta.medico_id == data['medico_id'],
-                Consulta.data_hora == data_hora,
-                Consulta.status != 'cancelada'
+        try:
+            duracao = validar_duracao(data.get('duracao_minutos', DURACAO_PADRAO))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Verificação de sobreposição e inserção são atômicas (agenda bloqueada)
+        def reservar():
+            if conflitos(data['medico_id'], data_hora, duracao):
+                raise ConflitoDeHorario()
+            
+            # O paciente pode ter sido excluído depois da verificação acima
+            if not paciente_existe(data['paciente_id']):
+                raise PacienteNaoEncontrado()
+            
+            consulta = Consulta(
+                paciente_id=data['paciente_id'],
+                medico_id=data['medico_id'],
+                data_hora=data_hora,
+                duracao_minutos=duracao,
+                tipo_consulta=data['tipo_consulta'],
+                observacoes=data.get('observacoes'),
+                status=data.get('status', 'agendada')
             )
-        ).first()
+            db.session.add(consulta)
+            return consulta
         
-        if conflito:
+        try:
+            consulta = agendar(data['medico_id'], reservar)
+        except ConflitoDeHorario:
             return jsonify({'error': 'Médico já possui consulta agendada neste horário'}), 400
-        
-        consulta = Consulta(
-            paciente_id=data['paciente_id'],
-            medico_id=data['medico_id'],
-            data_hora=data_hora,
-            tipo_consulta=data['tipo_consulta'],
-            observacoes=data.get('observacoes'),
-            status=data.get('status', 'agendada')
-        )
-        
-        db.session.add(consulta)
-        db.session.commit()
+        except PacienteNaoEncontrado:
+            return jsonify({'error': 'Paciente não encontrado'}), 404
         
         return jsonify(consulta.to_dict()), 201
     except Exception as e:
@@ -109,47 +296,66 @@ def atualizar_consulta(id):
         consulta = Consulta.query.get_or_404(id)
         data = request.get_json()
         
-        # Verificar conflito de horário se data/hora ou médico mudaram
-        if data.get('data_hora') or data.get('medico_id'):
-            nova_data_hora = datetime.strptime(data['data_hora'], '%Y-%m-%dT%H:%M') if data.get('data_hora') else consulta.data_hora
-            novo_medico_id = data.get('medico_id', consulta.medico_id)
-            
-            conflito = Consulta.query.filter(
-                and_(
-                    Consulta.id != id,
-                    Consulta.medico_id == novo_medico_id,
-                    Consulta.data_hora == nova_data_hora,
-                    Consulta.status != 'cancelada'
-                )
-            ).first()
-            
-            if conflito:
-                return jsonify({'error': 'Médico já possui consulta agendada neste horário'}), 400
-        
-        # Atualizar campos
-        if data.get('paciente_id'):
-            if not Paciente.query.get(data['paciente_id']):
-                return jsonify({'error': 'Paciente não encontrado'}), 404
-            consulta.paciente_id = data['paciente_id']
+        if data.get('duracao_minutos'):
+            try:
+                validar_duracao(data['duracao_minutos'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        if data.get('medico_id'):
-            if not Medico.query.get(data['medico_id']):
-                return jsonify({'error': 'Médico não encontrado'}), 404
-            consulta.medico_id = data['medico_id']
+        # Validar referências antes de bloquear a agenda
+        if data.get('paciente_id') and not Paciente.query.get(data['paciente_id']):
+            return jsonify({'error': 'Paciente não encontrado'}), 404
         
-        if data.get('data_hora'):
-            consulta.data_hora = datetime.strptime(data['data_hora'], '%Y-%m-%dT%H:%M')
+        if data.get('medico_id') and not Medico.query.get(data['medico_id']):
+            return jsonify({'error': 'Médico não encontrado'}), 404
         
-        if data.get('tipo_consulta'):
-            consulta.tipo_consulta = data['tipo_consulta']
+        nova_data_hora = datetime.strptime(data['data_hora'], '%Y-%m-%dT%H:%M') if data.get('data_hora') else None
+        novo_medico_id = data.get('medico_id') or consulta.medico_id
         
-        if 'observacoes' in data:
-            consulta.observacoes = data['observacoes']
+        def aplicar():
+            # Verificar conflito de horário se a consulta (ativa) muda de data/hora,
+            # duração ou médico, ou se deixa de estar cancelada
+            mudou_horario = bool(data.get('data_hora') or data.get('medico_id') or data.get('duracao_minutos'))
+            if ocupa_novo_horario(consulta.status, data.get('status') or consulta.status, mudou_horario):
+                if conflitos(
+                    novo_medico_id,
+                    nova_data_hora or consulta.data_hora,
+                    int(data.get('duracao_minutos') or consulta.duracao_minutos),
+                    ignorar_id=id
+                ):
+                    raise ConflitoDeHorario()
+            
+            # Atualizar campos
+            if data.get('paciente_id'):
+                if not paciente_existe(data['paciente_id']):
+                    raise PacienteNaoEncontrado()
+                consulta.paciente_id = data['paciente_id']
+            
+            if data.get('medico_id'):
+                consulta.medico_id = data['medico_id']
+            
+            if nova_data_hora:
+                consulta.data_hora = nova_data_hora
+            
+            if data.get('duracao_minutos'):
+                consulta.duracao_minutos = int(data['duracao_minutos'])
+            
+            if data.get('tipo_consulta'):
+                consulta.tipo_consulta = data['tipo_consulta']
+            
+            if 'observacoes' in data:
+                consulta.observacoes = data['observacoes']
+            
+            if data.get('status'):
+                consulta.status = data['status']
         
-        if data.get('status'):
-            consulta.status = data['status']
+        try:
+            agendar(novo_medico_id, aplicar)
+        except ConflitoDeHorario:
+            return jsonify({'error': 'Médico já possui consulta agendada neste horário'}), 400
+        except PacienteNaoEncontrado:
+            return jsonify({'error': 'Paciente não encontrado'}), 404
         
-        db.session.commit()
         return jsonify(consulta.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -175,11 +381,29 @@ def atualizar_status_consulta(id):
         if not data.get('status'):
             return jsonify({'error': 'Status é obrigatório'}), 400
         
-        consulta.status = data['status']
-        db.session.commit()
+        def aplicar():
+            # Reativar uma consulta cancelada volta a ocupar o horário
+            if ocupa_novo_horario(consulta.status, data['status']) and conflitos(
+                consulta.medico_id, consulta.data_hora, consulta.duracao_minutos, ignorar_id=id
+            ):
+                raise ConflitoDeHorario()
+            consulta.status = data['status']
+        
+        try:
+            agendar(consulta.medico_id, aplicar)
+        except ConflitoDeHorario:
+            return jsonify({'error': 'Médico já possui consulta agendada neste horário'}), 400
         
         return jsonify(consulta.to_dict()), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@consulta_bp.route('/consultas/bulk', methods=['POST'])
+def importar_consultas():
+    try:
+        resultado = importar('consultas', ler_registros(request.stream, request.mimetype))
+        return jsonify(resultado), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
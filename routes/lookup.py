@@ -0,0 +1,64 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.models.paciente import Paciente
+from src.models.medico import Medico
+from src.models.busca import fts_disponivel, buscar_ids
+
+lookup_bp = Blueprint('lookup', __name__)
+
+LIMITE_LOOKUP = 20
+LIMITE_MAXIMO_LOOKUP = 200
+
+def mascarar_cpf(cpf):
+    digitos = ''.join(c for c in cpf or '' if c.isdigit())
+    if len(digitos) == 11:
+        return f'***.{digitos[3:6]}.{digitos[6:9]}-**'
+    return '*' * max(len(cpf or '') - 3, 0) + (cpf or '')[-3:]
+
+# Seleciona só as colunas pedidas (sem carregar entidades do ORM). Com termo,
+# usa o índice FTS; sem termo, lista em ordem alfabética pelo índice de nome.
+def buscar_projecao(modelo, tabela, colunas, termo, limite):
+    if not termo:
+        return db.session.query(*colunas).order_by(modelo.nome).limit(limite).all()
+
+    if not fts_disponivel():
+        return db.session.query(*colunas).filter(
+            modelo.nome.ilike(f'{termo}%')
+        ).order_by(modelo.nome).limit(limite).all()
+
+    ids = buscar_ids(tabela, termo, limite)
+    por_id = {linha.id: linha for linha in db.session.query(*colunas).filter(modelo.id.in_(ids))}
+    return [por_id[id] for id in ids if id in por_id]
+
+def parametros_lookup():
+    termo = request.args.get('q', '').strip()
+    limite = min(max(request.args.get('limit', LIMITE_LOOKUP, type=int), 1), LIMITE_MAXIMO_LOOKUP)
+    return termo, limite
+
+@lookup_bp.route('/lookup/pacientes', methods=['GET'])
+def lookup_pacientes():
+    try:
+        termo, limite = parametros_lookup()
+        pacientes = buscar_projecao(
+            Paciente, 'pacientes', (Paciente.id, Paciente.nome, Paciente.cpf), termo, limite
+        )
+        return jsonify([
+            {'id': id, 'nome': nome, 'cpf': mascarar_cpf(cpf)}
+            for id, nome, cpf in pacientes
+        ]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@lookup_bp.route('/lookup/medicos', methods=['GET'])
+def lookup_medicos():
+    try:
+        termo, limite = parametros_lookup()
+        medicos = buscar_projecao(
+            Medico, 'medicos', (Medico.id, Medico.nome, Medico.especialidade), termo, limite
+        )
+        return jsonify([
+            {'id': id, 'nome': nome, 'especialidade': especialidade}
+            for id, nome, especialidade in medicos
+        ]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,14 +1,35 @@
 from flask import Blueprint, request, jsonify
+from datetime import datetime
 from src.models.user import db
 from src.models.medico import Medico
+from src.models.projecao import CampoInvalido, campos_do_modelo, ler_campos, query_campos, serializador_campos
+from src.models.agenda import DURACAO_PADRAO, validar_duracao, horarios_livres
+from src.models.importacao import importar, ler_registros
+from src.models.exclusao import excluir_medico
+from src.models.busca import fts_disponivel, buscar_ids, carregar_em_ordem
+from src.utils.etag import condicional
 
 medico_bp = Blueprint('medico', __name__)
 
+LIMITE_BUSCA = 50
+LIMITE_MAXIMO_BUSCA = 200
+
+CAMPOS_MEDICO = campos_do_modelo(Medico)
+
 @medico_bp.route('/medicos', methods=['GET'])
+@condicional('medicos')
 def listar_medicos():
     try:
+        campos = ler_campos(request.args.get('fields'), CAMPOS_MEDICO)
+        if campos:
+            linhas = query_campos(Medico, CAMPOS_MEDICO, campos).all()
+            serializar = serializador_campos(CAMPOS_MEDICO, campos)
+            return jsonify([serializar(linha) for linha in linhas]), 200
+        
         medicos = Medico.query.all()
         return jsonify([medico.to_dict() for medico in medicos]), 200
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -82,7 +103,7 @@ def atualizar_medico(id):
 def deletar_medico(id):
     try:
         medico = Medico.query.get_or_404(id)
-        db.session.delete(medico)
+        excluir_medico(medico)
         db.session.commit()
         return jsonify({'message': 'Médico deletado com sucesso'}), 200
     except Exception as e:
@@ -96,17 +117,47 @@ def buscar_medicos():
         if not termo:
             return jsonify([]), 200
         
-        medicos = Medico.query.filter(
-            Medico.nome.contains(termo) | 
-            Medico.crm.contains(termo) |
-            Medico.especialidade.contains(termo)
-        ).all()
+        limite = min(max(request.args.get('limit', LIMITE_BUSCA, type=int), 1), LIMITE_MAXIMO_BUSCA)
+        
+        if fts_disponivel():
+            medicos = carregar_em_ordem(Medico, buscar_ids('medicos', termo, limite))
+        else:
+            medicos = Medico.query.filter(
+                Medico.nome.contains(termo) | 
+                Medico.crm.contains(termo) |
+                Medico.especialidade.contains(termo)
+            ).limit(limite).all()
         
         return jsonify([medico.to_dict() for medico in medicos]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@medico_bp.route('/medicos/<int:id>/horarios-livres', methods=['GET'])
+def listar_horarios_livres(id):
+    try:
+        Medico.query.get_or_404(id)
+        
+        if not request.args.get('data'):
+            return jsonify({'error': 'data é obrigatória'}), 400
+        
+        try:
+            dia = datetime.strptime(request.args['data'], '%Y-%m-%d').date()
+            inicio = datetime.strptime(request.args.get('inicio', '08:00'), '%H:%M').time()
+            fim = datetime.strptime(request.args.get('fim', '18:00'), '%H:%M').time()
+            duracao = validar_duracao(request.args.get('duracao', DURACAO_PADRAO))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        livres = horarios_livres(id, dia, inicio, fim, duracao)
+        return jsonify([
+            {'inicio': inicio.isoformat(), 'fim': fim.isoformat()}
+            for inicio, fim in livres
+        ]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
+
 @medico_bp.route('/medicos/especialidades', methods=['GET'])
+@condicional('medicos')
 def listar_especialidades():
     try:
         especialidades = db.session.query(Medico.especialidade).distinct().all()
@@ -114,3 +165,11 @@ def listar_especialidades():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@medico_bp.route('/medicos/bulk', methods=['POST'])
+def importar_medicos():
+    try:
+        resultado = importar('medicos', ler_registros(request.stream, request.mimetype))
+        return jsonify(resultado), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -1,15 +1,34 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.paciente import Paciente
+from src.models.projecao import CampoInvalido, campos_do_modelo, ler_campos, query_campos, serializador_campos
+from src.models.importacao import importar, ler_registros
+from src.models.exclusao import excluir_paciente
+from src.models.busca import fts_disponivel, buscar_ids, carregar_em_ordem
+from src.utils.etag import condicional
 from datetime import datetime
 
 paciente_bp = Blueprint('paciente', __name__)
 
+LIMITE_BUSCA = 50
+LIMITE_MAXIMO_BUSCA = 200
+
+CAMPOS_PACIENTE = campos_do_modelo(Paciente)
+
 @paciente_bp.route('/pacientes', methods=['GET'])
+@condicional('pacientes')
 def listar_pacientes():
     try:
+        campos = ler_campos(request.args.get('fields'), CAMPOS_PACIENTE)
+        if campos:
+            linhas = query_campos(Paciente, CAMPOS_PACIENTE, campos).all()
+            serializar = serializador_campos(CAMPOS_PACIENTE, campos)
+            return jsonify([serializar(linha) for linha in linhas]), 200
+        
         pacientes = Paciente.query.all()
         return jsonify([paciente.to_dict() for paciente in pacientes]), 200
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -89,7 +108,7 @@ def atualizar_paciente(id):
 def deletar_paciente(id):
     try:
         paciente = Paciente.query.get_or_404(id)
-        db.session.delete(paciente)
+        excluir_paciente(paciente)
         db.session.commit()
         return jsonify({'message': 'Paciente deletado com sucesso'}), 200
     except Exception as e:
@@ -103,12 +122,25 @@ def buscar_pacientes():
         if not termo:
             return jsonify([]), 200
         
-        pacientes = Paciente.query.filter(
-            Paciente.nome.contains(termo) | 
-            Paciente.cpf.contains(termo)
-        ).all()
+        limite = min(max(request.args.get('limit', LIMITE_BUSCA, type=int), 1), LIMITE_MAXIMO_BUSCA)
+        
+        if fts_disponivel():
+            pacientes = carregar_em_ordem(Paciente, buscar_ids('pacientes', termo, limite))
+        else:
+            pacientes = Paciente.query.filter(
+                Paciente.nome.contains(termo) | 
+                Paciente.cpf.contains(termo)
+            ).limit(limite).all()
         
         return jsonify([paciente.to_dict() for paciente in pacientes]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@paciente_bp.route('/pacientes/bulk', methods=['POST'])
+def importar_pacientes():
+    try:
+        resultado = importar('pacientes', ler_registros(request.stream, request.mimetype))
+        return jsonify(resultado), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
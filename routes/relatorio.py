@@ -1,96 +1,201 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from src.models.user import db
 from src.models.consulta import Consulta
 from src.models.paciente import Paciente
 from src.models.medico import Medico
+from src.models.resumo import ResumoConsultaDiario
+from src.models.arquivo import ConsultasArquivadasPorPaciente
+from src.models.relatorio_job import RelatorioJob, enfileirar
+from src.utils.cache import CacheTTL, caches, invalidar_ao_alterar
+from src.utils.exportacao import resposta_csv_dicts
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, extract
+from sqlalchemy import func, and_, case, literal, true, union_all
 
 relatorio_bp = Blueprint('relatorio', __name__)
 
+# Converte data_inicio/data_fim (YYYY-MM-DD) em limites do intervalo semiaberto
+# [inicio, fim), incluindo o dia final inteiro. Comparações diretas com
+# data_hora permitem o uso dos índices da coluna.
+def intervalo_datas(data_inicio=None, data_fim=None):
+    inicio = datetime.strptime(data_inicio, '%Y-%m-%d') if data_inicio else None
+    fim = datetime.strptime(data_fim, '%Y-%m-%d') + timedelta(days=1) if data_fim else None
+    return inicio, fim
+
+def filtrar_periodo_resumo(query, inicio, fim):
+    if inicio:
+        query = query.filter(ResumoConsultaDiario.dia >= inicio.date())
+    if fim:
+        query = query.filter(ResumoConsultaDiario.dia < fim.date())
+    return query
+
+# Payload do dashboard, esvaziado a cada escrita em pacientes, médicos ou consultas
+cache_dashboard = invalidar_ao_alterar(
+    CacheTTL('dashboard', ttl=30), 'pacientes', 'medicos', 'consultas'
+)
+
+def calcular_dashboard():
+    agora = datetime.now()
+    hoje = agora.date()
+    inicio_mes = hoje.replace(day=1)
+    R = ResumoConsultaDiario
+    
+    # Contagens gerais, do mês, de hoje e por status em uma única query
+    # sobre o resumo diário. O LEFT JOIN a partir de uma linha fixa garante
+    # um resultado mesmo sem nenhuma consulta cadastrada.
+    linha_unica = db.select(literal(1).label('um')).subquery()
+    linhas = db.session.query(
+        db.select(func.count(Paciente.id)).scalar_subquery(),
+        db.select(func.count(Medico.id)).scalar_subquery(),
+        R.status,
+        func.sum(R.total),
+        func.sum(case((R.dia >= inicio_mes, R.total), else_=0)),
+        func.sum(case((R.dia == hoje, R.total), else_=0))
+    ).select_from(linha_unica).outerjoin(R, true()).group_by(R.status).all()
+    
+    total_pacientes, total_medicos = linhas[0][0], linhas[0][1]
+    consultas_por_status = [
+        (status, total, mes, dia)
+        for _, _, status, total, mes, dia in linhas
+        if total
+    ]
+    
+    # Próximas consultas (próximos 7 dias)
+    proximas_consultas = Consulta.query_com_nomes().filter(
+        and_(
+            Consulta.data_hora >= agora,
+            Consulta.data_hora <= agora + timedelta(days=7),
+            Consulta.status == 'agendada'
+        )
+    ).order_by(Consulta.data_hora).limit(10).all()
+    
+    return {
+        'estatisticas': {
+            'total_pacientes': total_pacientes,
+            'total_medicos': total_medicos,
+            'total_consultas': sum(total for _, total, _, _ in consultas_por_status),
+            'consultas_mes': sum(mes for _, _, mes, _ in consultas_por_status),
+            'consultas_hoje': sum(dia for _, _, _, dia in consultas_por_status)
+        },
+        'consultas_por_status': [
+            {'status': status, 'quantidade': total}
+            for status, total, _, _ in consultas_por_status
+        ],
+        'proximas_consultas': [consulta.to_dict() for consulta in proximas_consultas]
+    }
+
 @relatorio_bp.route('/relatorios/dashboard', methods=['GET'])
 def dashboard():
     try:
-        hoje = datetime.now().date()
-        inicio_mes = hoje.replace(day=1)
-        
-        # Estatísticas gerais
-        total_pacientes = Paciente.query.count()
-        total_medicos = Medico.query.count()
-        total_consultas = Consulta.query.count()
-        
-        # Consultas do mês atual
-        consultas_mes = Consulta.query.filter(
-            Consulta.data_hora >= inicio_mes
-        ).count()
-        
-        # Consultas de hoje
-        consultas_hoje = Consulta.query.filter(
-            func.date(Consulta.data_hora) == hoje
-        ).count()
-        
-        # Consultas por status
-        consultas_por_status = db.session.query(
-            Consulta.status,
-            func.count(Consulta.id)
-        ).group_by(Consulta.status).all()
-        
-        # Próximas consultas (próximos 7 dias)
-        proximas_consultas = Consulta.query.filter(
-            and_(
-                Consulta.data_hora >= datetime.now(),
-                Consulta.data_hora <= datetime.now() + timedelta(days=7),
-                Consulta.status == 'agendada'
-            )
-        ).order_by(Consulta.data_hora).limit(10).all()
-        
-        return jsonify({
-            'estatisticas': {
-                'total_pacientes': total_pacientes,
-                'total_medicos': total_medicos,
-                'total_consultas': total_consultas,
-                'consultas_mes': consultas_mes,
-                'consultas_hoje': consultas_hoje
-            },
-            'consultas_por_status': [
-                {'status': status, 'quantidade': quantidade}
-                for status, quantidade in consultas_por_status
-            ],
-            'proximas_consultas': [consulta.to_dict() for consulta in proximas_consultas]
-        }), 200
+        return jsonify(cache_dashboard.obter('dashboard', calcular_dashboard)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@relatorio_bp.route('/relatorios/cache', methods=['GET'])
+def estatisticas_cache():
+    return jsonify([cache.estatisticas() for cache in caches]), 200
+
+def calcular_consultas_por_medico(data_inicio=None, data_fim=None):
+    total_consultas = func.sum(ResumoConsultaDiario.total)
+    query = db.session.query(
+        Medico.nome,
+        Medico.especialidade,
+        total_consultas.label('total_consultas')
+    ).join(ResumoConsultaDiario, Medico.id == ResumoConsultaDiario.medico_id)
+    
+    query = filtrar_periodo_resumo(query, *intervalo_datas(data_inicio, data_fim))
+    
+    resultados = query.group_by(Medico.id).having(
+        total_consultas > 0
+    ).order_by(total_consultas.desc()).all()
+    
+    return [
+        {
+            'medico': nome,
+            'especialidade': especialidade,
+            'total_consultas': total
+        }
+        for nome, especialidade, total in resultados
+    ]
+
+def calcular_consultas_por_periodo(data_inicio, data_fim, agrupamento='dia'):
+    inicio, fim = intervalo_datas(data_inicio, data_fim)
+    
+    # Totais diários vêm do resumo; mês e ano são derivados deles
+    totais_por_dia = filtrar_periodo_resumo(
+        db.session.query(
+            ResumoConsultaDiario.dia,
+            func.sum(ResumoConsultaDiario.total)
+        ),
+        inicio, fim
+    ).group_by(ResumoConsultaDiario.dia).order_by(ResumoConsultaDiario.dia).all()
+    
+    tamanho_periodo = {'dia': 10, 'mes': 7}.get(agrupamento, 4)  # ano
+    resultados = {}
+    for dia, total in totais_por_dia:
+        if not total:
+            continue
+        periodo = dia.isoformat()[:tamanho_periodo]
+        resultados[periodo] = resultados.get(periodo, 0) + total
+    
+    return [
+        {
+            'periodo': periodo,
+            'total_consultas': total
+        }
+        for periodo, total in resultados.items()
+    ]
+
+def calcular_especialidades_mais_procuradas(data_inicio=None, data_fim=None):
+    total_consultas = func.sum(ResumoConsultaDiario.total)
+    query = db.session.query(
+        Medico.especialidade,
+        total_consultas.label('total_consultas')
+    ).join(ResumoConsultaDiario, Medico.id == ResumoConsultaDiario.medico_id)
+    
+    query = filtrar_periodo_resumo(query, *intervalo_datas(data_inicio, data_fim))
+    
+    resultados = query.group_by(Medico.especialidade).having(
+        total_consultas > 0
+    ).order_by(total_consultas.desc()).all()
+    
+    return [
+        {
+            'especialidade': especialidade,
+            'total_consultas': total
+        }
+        for especialidade, total in resultados
+    ]
+
+# Consultas ativas contadas na hora mais os totais já agregados das arquivadas
+def calcular_pacientes_frequentes(limite=10):
+    por_paciente = union_all(
+        db.select(Consulta.paciente_id, func.count().label('total')).group_by(Consulta.paciente_id),
+        db.select(ConsultasArquivadasPorPaciente.paciente_id, ConsultasArquivadasPorPaciente.total)
+    ).subquery()
+    total_consultas = func.sum(por_paciente.c.total)
+    resultados = db.session.query(
+        Paciente.nome,
+        Paciente.cpf,
+        total_consultas.label('total_consultas')
+    ).join(por_paciente, Paciente.id == por_paciente.c.paciente_id).group_by(
+        Paciente.id
+    ).having(total_consultas > 0).order_by(total_consultas.desc()).limit(limite).all()
+    
+    return [
+        {
+            'paciente': nome,
+            'cpf': cpf,
+            'total_consultas': total
+        }
+        for nome, cpf, total in resultados
+    ]
+
 @relatorio_bp.route('/relatorios/consultas-por-medico', methods=['GET'])
 def consultas_por_medico():
     try:
-        data_inicio = request.args.get('data_inicio')
-        data_fim = request.args.get('data_fim')
-        
-        query = db.session.query(
-            Medico.nome,
-            Medico.especialidade,
-            func.count(Consulta.id).label('total_consultas')
-        ).join(Consulta, Medico.id == Consulta.medico_id)
-        
-        if data_inicio:
-            data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-            query = query.filter(Consulta.data_hora >= data_inicio)
-        
-        if data_fim:
-            data_fim = datetime.strptime(data_fim, '%Y-%m-%d')
-            query = query.filter(Consulta.data_hora <= data_fim)
-        
-        resultados = query.group_by(Medico.id).order_by(func.count(Consulta.id).desc()).all()
-        
-        return jsonify([
-            {
-                'medico': nome,
-                'especialidade': especialidade,
-                'total_consultas': total
-            }
-            for nome, especialidade, total in resultados
-        ]), 200
+        return jsonify(calcular_consultas_por_medico(
+            request.args.get('data_inicio'), request.args.get('data_fim')
+        )), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -104,94 +209,104 @@ def consultas_por_periodo():
         if not data_inicio or not data_fim:
             return jsonify({'error': 'data_inicio e data_fim são obrigatórios'}), 400
         
-        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-        data_fim = datetime.strptime(data_fim, '%Y-%m-%d')
-        
-        if agrupamento == 'dia':
-            query = db.session.query(
-                func.date(Consulta.data_hora).label('periodo'),
-                func.count(Consulta.id).label('total')
-            )
-        elif agrupamento == 'mes':
-            query = db.session.query(
-                func.strftime('%Y-%m', Consulta.data_hora).label('periodo'),
-                func.count(Consulta.id).label('total')
-            )
-        else:  # ano
-            query = db.session.query(
-                extract('year', Consulta.data_hora).label('periodo'),
-                func.count(Consulta.id).label('total')
-            )
-        
-        resultados = query.filter(
-            and_(
-                Consulta.data_hora >= data_inicio,
-                Consulta.data_hora <= data_fim
-            )
-        ).group_by('periodo').order_by('periodo').all()
-        
-        return jsonify([
-            {
-                'periodo': str(periodo),
-                'total_consultas': total
-            }
-            for periodo, total in resultados
-        ]), 200
+        return jsonify(calcular_consultas_por_periodo(data_inicio, data_fim, agrupamento)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @relatorio_bp.route('/relatorios/especialidades-mais-procuradas', methods=['GET'])
 def especialidades_mais_procuradas():
     try:
-        data_inicio = request.args.get('data_inicio')
-        data_fim = request.args.get('data_fim')
-        
-        query = db.session.query(
-            Medico.especialidade,
-            func.count(Consulta.id).label('total_consultas')
-        ).join(Consulta, Medico.id == Consulta.medico_id)
-        
-        if data_inicio:
-            data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-            query = query.filter(Consulta.data_hora >= data_inicio)
-        
-        if data_fim:
-            data_fim = datetime.strptime(data_fim, '%Y-%m-%d')
-            query = query.filter(Consulta.data_hora <= data_fim)
-        
-        resultados = query.group_by(Medico.especialidade).order_by(func.count(Consulta.id).desc()).all()
-        
-        return jsonify([
-            {
-                'especialidade': especialidade,
-                'total_consultas': total
-            }
-            for especialidade, total in resultados
-        ]), 200
+        return jsonify(calcular_especialidades_mais_procuradas(
+            request.args.get('data_inicio'), request.args.get('data_fim')
+        )), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @relatorio_bp.route('/relatorios/pacientes-frequentes', methods=['GET'])
 def pacientes_frequentes():
     try:
-        limite = request.args.get('limite', 10, type=int)
+        return jsonify(calcular_pacientes_frequentes(request.args.get('limite', 10, type=int))), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Normaliza os parâmetros de um relatório (datas em ISO, valores padrão
+# explícitos) para que pedidos equivalentes tenham a mesma chave
+def _data_iso(valor, obrigatoria=False):
+    if not valor:
+        if obrigatoria:
+            raise ValueError('data_inicio e data_fim são obrigatórios')
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f'Data inválida: {valor}')
+
+def _parametros_periodo(parametros, obrigatorio=False):
+    return {
+        'data_inicio': _data_iso(parametros.get('data_inicio'), obrigatorio),
+        'data_fim': _data_iso(parametros.get('data_fim'), obrigatorio)
+    }
+
+def _parametros_por_periodo(parametros):
+    agrupamento = parametros.get('agrupamento') or 'dia'
+    if agrupamento not in ('dia', 'mes', 'ano'):
+        raise ValueError('agrupamento deve ser dia, mes ou ano')
+    return {**_parametros_periodo(parametros, obrigatorio=True), 'agrupamento': agrupamento}
+
+def _parametros_frequentes(parametros):
+    try:
+        return {'limite': int(parametros.get('limite', 10))}
+    except (TypeError, ValueError):
+        raise ValueError('limite inválido')
+
+RELATORIOS_ASSINCRONOS = {
+    'consultas-por-medico': (calcular_consultas_por_medico, _parametros_periodo),
+    'consultas-por-periodo': (calcular_consultas_por_periodo, _parametros_por_periodo),
+    'especialidades-mais-procuradas': (calcular_especialidades_mais_procuradas, _parametros_periodo),
+    'pacientes-frequentes': (calcular_pacientes_frequentes, _parametros_frequentes),
+}
+
+# CSV de qualquer relatório, com os mesmos parâmetros da versão JSON
+@relatorio_bp.route('/relatorios/<tipo>/export.csv', methods=['GET'])
+def exportar_relatorio(tipo):
+    try:
+        if tipo not in RELATORIOS_ASSINCRONOS:
+            return jsonify({'error': 'Relatório não encontrado'}), 404
+        
+        calcular, normalizar = RELATORIOS_ASSINCRONOS[tipo]
+        try:
+            parametros = normalizar(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return resposta_csv_dicts(f'{tipo}.csv', calcular(**parametros)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@relatorio_bp.route('/relatorios/jobs', methods=['POST'])
+def criar_job_relatorio():
+    try:
+        data = request.get_json() or {}
+        tipo = data.get('tipo')
+        if tipo not in RELATORIOS_ASSINCRONOS:
+            return jsonify({'error': f"tipo deve ser um de: {', '.join(RELATORIOS_ASSINCRONOS)}"}), 400
         
-        resultados = db.session.query(
-            Paciente.nome,
-            Paciente.cpf,
-            func.count(Consulta.id).label('total_consultas')
-        ).join(Consulta, Paciente.id == Consulta.paciente_id).group_by(
-            Paciente.id
-        ).order_by(func.count(Consulta.id).desc()).limit(limite).all()
+        calcular, normalizar = RELATORIOS_ASSINCRONOS[tipo]
+        try:
+            parametros = normalizar(data.get('parametros') or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify([
-            {
-                'paciente': nome,
-                'cpf': cpf,
-                'total_consultas': total
-            }
-            for nome, cpf, total in resultados
-        ]), 200
+        job = enfileirar(current_app._get_current_object(), tipo, parametros, calcular)
+        return jsonify(job.to_dict()), 202 if job.status != 'concluido' else 200
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@relatorio_bp.route('/relatorios/jobs/<id>', methods=['GET'])
+def obter_job_relatorio(id):
+    try:
+        job = RelatorioJob.query.get_or_404(id)
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
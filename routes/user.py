@@ -1,10 +1,61 @@
-from flask import Blueprint, jsonify, request
+from datetime import datetime, timedelta
+from flask import Blueprint, g, jsonify, request
 from src.models.user import User, db
+from src.utils.autenticacao import COOKIE_TOKEN, VALIDADE_TOKEN, gerar_token
+from src.models.projecao import CampoInvalido, campos_do_modelo, ler_campos, query_campos, serializador_campos
 
 user_bp = Blueprint('user', __name__)
 
+CAMPOS_USER = campos_do_modelo(User, excluir=('password_hash', 'tokens_revogados_em'))
+
+@user_bp.route('/login', methods=['POST'])
+def login():
+    try:
+        data = request.get_json(silent=True) or {}
+        user = User.query.filter_by(username=data.get('username')).first()
+        if not user or not user.ativo or not user.check_password(data.get('password') or ''):
+            return jsonify({'error': 'Usuário ou senha inválidos'}), 401
+
+        token = gerar_token(user)
+        resposta = jsonify({
+            'token': token,
+            'expira_em': (datetime.utcnow() + timedelta(seconds=VALIDADE_TOKEN)).isoformat(),
+            'user': user.to_dict()
+        })
+        # Cookie para downloads (GET); chamadas da API usam o cabeçalho Authorization
+        resposta.set_cookie(
+            COOKIE_TOKEN, token, max_age=VALIDADE_TOKEN, httponly=True,
+            samesite='Strict', secure=request.is_secure
+        )
+        return resposta
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@user_bp.route('/logout', methods=['POST'])
+def logout():
+    try:
+        # Invalida todos os tokens já emitidos para o usuário
+        user = User.query.get_or_404(g.usuario_id)
+        user.revogar_tokens()
+        db.session.commit()
+        resposta = jsonify({'message': 'Sessão encerrada'})
+        resposta.delete_cookie(COOKIE_TOKEN)
+        return resposta
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
+    try:
+        campos = ler_campos(request.args.get('fields'), CAMPOS_USER)
+    except CampoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    if campos:
+        linhas = query_campos(User, CAMPOS_USER, campos).all()
+        serializar = serializador_campos(CAMPOS_USER, campos)
+        return jsonify([serializar(linha) for linha in linhas])
+    
     users = User.query.all()
     return jsonify([user.to_dict() for user in users])
 
@@ -12,7 +63,10 @@ def get_users():
 def create_user():
     
     data = request.json
+    if not data.get('password'):
+        return jsonify({'error': 'password é obrigatório'}), 400
     user = User(username=data['username'], email=data['email'])
+    user.set_password(data['password'])
     db.session.add(user)
     db.session.commit()
     return jsonify(user.to_dict()), 201
@@ -28,6 +82,12 @@ def update_user(user_id):
     data = request.json
     user.username = data.get('username', user.username)
     user.email = data.get('email', user.email)
+    if 'ativo' in data:
+        user.ativo = bool(data['ativo'])
+    if data.get('password'):
+        # Troca de senha encerra as sessões abertas com a senha antiga
+        user.set_password(data['password'])
+        user.revogar_tokens()
     db.session.commit()
     return jsonify(user.to_dict())
 
@@ -9,10 +9,17 @@ let pacientes = [];
 let medicos = [];
 let consultas = [];
 
+// Token de acesso obtido em /api/login
+let token = localStorage.getItem('token');
+
 // Inicialização da aplicação
 document.addEventListener('DOMContentLoaded', function() {
-    loadDashboard();
     setupEventListeners();
+    if (token) {
+        loadDashboard();
+    } else {
+        mostrarLogin();
+    }
 });
 
 // Configurar event listeners
@@ -36,6 +43,15 @@ function setupEventListeners() {
             loadMedicos();
         }
     });
+
+    // Busca incremental de paciente/médico no formulário de consultas
+    document.getElementById('consulta-paciente-busca').addEventListener('input', debounce(function() {
+        carregarOpcoesPacientes(this.value);
+    }, 250));
+
+    document.getElementById('consulta-medico-busca').addEventListener('input', debounce(function() {
+        carregarOpcoesMedicos(this.value);
+    }, 250));
 }
 
 // Navegação entre seções
@@ -78,17 +94,68 @@ function showSection(section) {
     }
 }
 
+// Autenticação
+function mostrarLogin() {
+    bootstrap.Modal.getOrCreateInstance(document.getElementById('loginModal')).show();
+}
+
+async function login() {
+    try {
+        const response = await fetch(API_BASE + '/login', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                username: document.getElementById('login-username').value,
+                password: document.getElementById('login-password').value
+            })
+        });
+        if (!response.ok) {
+            showAlert('Usuário ou senha inválidos', 'danger');
+            return;
+        }
+
+        const data = await response.json();
+        token = data.token;
+        localStorage.setItem('token', token);
+        document.getElementById('login-password').value = '';
+        bootstrap.Modal.getInstance(document.getElementById('loginModal')).hide();
+        loadDashboard();
+    } catch (error) {
+        console.error('Erro no login:', error);
+        showAlert('Erro na comunicação com o servidor', 'danger');
+    }
+}
+
+async function logout() {
+    try {
+        await apiRequest('/logout', { method: 'POST' });
+    } finally {
+        token = null;
+        localStorage.removeItem('token');
+        mostrarLogin();
+    }
+}
+
 // Funções de API
 async function apiRequest(endpoint, options = {}) {
     try {
         const response = await fetch(API_BASE + endpoint, {
+            ...options,
             headers: {
                 'Content-Type': 'application/json',
+                ...(token ? { 'Authorization': `Bearer ${token}` } : {}),
                 ...options.headers
-            },
-            ...options
+            }
         });
         
+        if (response.status === 401) {
+            // Token ausente, expirado ou revogado
+            token = null;
+            localStorage.removeItem('token');
+            mostrarLogin();
+            throw new Error('Não autenticado');
+        }
+
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
@@ -469,35 +536,55 @@ function updateConsultasTable(data) {
 
 async function loadSelectOptions() {
     try {
-        // Carregar pacientes para o select
-        const pacientesData = await apiRequest('/pacientes');
-        const pacienteSelect = document.getElementById('consulta-paciente');
-        pacienteSelect.innerHTML = '<option value="">Selecione um paciente</option>' +
-            pacientesData.map(p => `<option value="${p.id}">${p.nome}</option>`).join('');
-        
-        // Carregar médicos para o select
-        const medicosData = await apiRequest('/medicos');
-        const medicoSelect = document.getElementById('consulta-medico');
-        medicoSelect.innerHTML = '<option value="">Selecione um médico</option>' +
-            medicosData.map(m => `<option value="${m.id}">${m.nome} - ${m.especialidade}</option>`).join('');
+        // Listas compactas (id/nome) em vez dos cadastros completos
+        await Promise.all([carregarOpcoesPacientes(), carregarOpcoesMedicos()]);
     } catch (error) {
         console.error('Erro ao carregar opções:', error);
     }
 }
 
-async function filtrarConsultas() {
+async function carregarOpcoesPacientes(termo = '') {
+    const pacienteSelect = document.getElementById('consulta-paciente');
+    const selecionado = pacienteSelect.value;
+    const pacientesData = await apiRequest(`/lookup/pacientes?q=${encodeURIComponent(termo)}&limit=20`);
+    pacienteSelect.innerHTML = '<option value="">Selecione um paciente</option>' +
+        pacientesData.map(p => `<option value="${p.id}">${p.nome} (${p.cpf})</option>`).join('');
+    pacienteSelect.value = pacientesData.some(p => String(p.id) === selecionado) ? selecionado : '';
+}
+
+async function carregarOpcoesMedicos(termo = '') {
+    const medicoSelect = document.getElementById('consulta-medico');
+    const selecionado = medicoSelect.value;
+    const medicosData = await apiRequest(`/lookup/medicos?q=${encodeURIComponent(termo)}&limit=50`);
+    medicoSelect.innerHTML = '<option value="">Selecione um médico</option>' +
+        medicosData.map(m => `<option value="${m.id}">${m.nome} - ${m.especialidade}</option>`).join('');
+    medicoSelect.value = medicosData.some(m => String(m.id) === selecionado) ? selecionado : '';
+}
+
+// Garante que o registro da consulta em edição esteja entre as opções do select
+function garantirOpcao(select, id, texto) {
+    if (!Array.from(select.options).some(option => option.value === String(id))) {
+        select.add(new Option(texto, id));
+    }
+    select.value = id;
+}
+
+function parametrosFiltroConsultas() {
     const dataInicio = document.getElementById('filter-data-inicio').value;
     const dataFim = document.getElementById('filter-data-fim').value;
     const status = document.getElementById('filter-status').value;
     
-    let url = '/consultas?';
     const params = [];
     
     if (dataInicio) params.push(`data_inicio=${dataInicio}`);
     if (dataFim) params.push(`data_fim=${dataFim}`);
     if (status) params.push(`status=${status}`);
     
-    url += params.join('&');
+    return params.join('&');
+}
+
+async function filtrarConsultas() {
+    const url = '/consultas?' + parametrosFiltroConsultas();
     
     try {
         const data = await apiRequest(url);
@@ -507,15 +594,25 @@ async function filtrarConsultas() {
     }
 }
 
+// Baixa as consultas filtradas em CSV (gerado em streaming pelo servidor)
+function exportarConsultas() {
+    window.location.href = API_BASE + '/consultas/export.csv?' + parametrosFiltroConsultas();
+}
+
+function exportarRelatorio(tipo) {
+    window.location.href = `${API_BASE}/relatorios/${tipo}/export.csv`;
+}
+
 function showConsultaModal(consulta = null) {
     const modal = new bootstrap.Modal(document.getElementById('consultaModal'));
     
     if (consulta) {
         // Edição
         document.getElementById('consulta-id').value = consulta.id;
-        document.getElementById('consulta-paciente').value = consulta.paciente_id;
-        document.getElementById('consulta-medico').value = consulta.medico_id;
+        garantirOpcao(document.getElementById('consulta-paciente'), consulta.paciente_id, consulta.paciente_nome);
+        garantirOpcao(document.getElementById('consulta-medico'), consulta.medico_id, consulta.medico_nome);
         document.getElementById('consulta-data-hora').value = consulta.data_hora.slice(0, 16);
+        document.getElementById('consulta-duracao').value = consulta.duracao_minutos;
         document.getElementById('consulta-tipo').value = consulta.tipo_consulta;
         document.getElementById('consulta-status').value = consulta.status;
         document.getElementById('consulta-observacoes').value = consulta.observacoes || '';
@@ -524,6 +621,7 @@ function showConsultaModal(consulta = null) {
         document.getElementById('consultaForm').reset();
         document.getElementById('consulta-id').value = '';
         document.getElementById('consulta-status').value = 'agendada';
+        document.getElementById('consulta-duracao').value = 30;
     }
     
     modal.show();
@@ -541,6 +639,7 @@ async function salvarConsulta() {
         paciente_id: parseInt(document.getElementById('consulta-paciente').value),
         medico_id: parseInt(document.getElementById('consulta-medico').value),
         data_hora: document.getElementById('consulta-data-hora').value,
+        duracao_minutos: parseInt(document.getElementById('consulta-duracao').value),
         tipo_consulta: document.getElementById('consulta-tipo').value,
         status: document.getElementById('consulta-status').value,
         observacoes: document.getElementById('consulta-observacoes').value
@@ -666,6 +765,14 @@ function updateEspecialidadeChart(data) {
 }
 
 // Funções utilitárias
+function debounce(fn, espera) {
+    let timer;
+    return function(...args) {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn.apply(this, args), espera);
+    };
+}
+
 function formatDate(dateString) {
     if (!dateString) return '-';
     const date = new Date(dateString);
@@ -0,0 +1,79 @@
+import os
+import time
+from datetime import timezone
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from src.models.user import User, db
+from src.utils.cache import CacheTTL, invalidar_ao_alterar
+
+# Autenticação por token assinado (SECRET_KEY) e com validade. A senha (PBKDF2,
+# caro de propósito) só é verificada no login; nas demais requisições basta
+# conferir a assinatura do token. Usuários desativados ou com tokens revogados
+# (logout, troca de senha) são barrados pelo estado guardado num cache LRU:
+# uma consulta pela PK a cada TTL por usuário, esvaziado na hora quando a
+# tabela users muda neste worker.
+#
+# O token vai no cabeçalho Authorization: Bearer. Para downloads e navegação
+# (GET/HEAD) também é aceito o cookie definido no login; escritas exigem o
+# cabeçalho, o que evita CSRF.
+
+VALIDADE_TOKEN = int(os.environ.get('TOKEN_VALIDADE_SEGUNDOS', 8 * 3600))
+COOKIE_TOKEN = 'token'
+ENDPOINTS_PUBLICOS = {'user.login', 'serve', 'static', 'metricas'}
+
+cache_usuarios = invalidar_ao_alterar(CacheTTL('usuarios', ttl=30, maximo=1024), 'users')
+
+def _serializador():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='token-acesso')
+
+# O instante de emissão vai no payload com fração de segundo: o timestamp do
+# itsdangerous é em segundos inteiros e confundiria um novo login com os
+# tokens revogados no mesmo segundo
+def gerar_token(usuario):
+    return _serializador().dumps({'uid': usuario.id, 'em': time.time()})
+
+# (ativo, tokens_revogados_em) do usuário, ou None se não existir
+def estado_usuario(usuario_id):
+    def carregar():
+        linha = db.session.query(User.ativo, User.tokens_revogados_em).filter(User.id == usuario_id).first()
+        return (bool(linha.ativo), linha.tokens_revogados_em) if linha else None
+    return cache_usuarios.obter(usuario_id, carregar)
+
+# Id do usuário do token, ou None se inválido, expirado ou revogado
+def verificar_token(token):
+    try:
+        dados = _serializador().loads(token, max_age=VALIDADE_TOKEN)
+    except BadSignature:
+        return None
+
+    estado = estado_usuario(dados['uid'])
+    if not estado or not estado[0]:
+        return None
+    revogados_em = estado[1]
+    if revogados_em and dados['em'] <= revogados_em.replace(tzinfo=timezone.utc).timestamp():
+        return None
+    return dados['uid']
+
+def token_da_requisicao():
+    cabecalho = request.headers.get('Authorization', '')
+    if cabecalho.startswith('Bearer '):
+        return cabecalho[len('Bearer '):]
+    if request.method in ('GET', 'HEAD'):
+        return request.cookies.get(COOKIE_TOKEN)
+    return None
+
+# before_request: rotas da API exigem token válido
+def exigir_autenticacao():
+    if (
+        request.method == 'OPTIONS'
+        or request.endpoint in ENDPOINTS_PUBLICOS
+        or not request.path.startswith('/api/')
+    ):
+        return None
+
+    token = token_da_requisicao()
+    usuario_id = verificar_token(token) if token else None
+    if usuario_id is None:
+        return jsonify({'error': 'Não autenticado'}), 401
+    g.usuario_id = usuario_id
+    return None
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Cache em memória do processo com expiração por tempo (TTL) e contadores
+# de acerto/erro para monitoramento. Com `maximo`, guarda no máximo essa
+# quantidade de chaves, descartando as usadas há mais tempo (LRU).
+class CacheTTL:
+    def __init__(self, nome, ttl, maximo=None):
+        self.nome = nome
+        self.ttl = ttl
+        self.maximo = maximo
+        self.hits = 0
+        self.misses = 0
+        self._valores = OrderedDict()
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._valores.get(chave)
+            if item and item[0] > agora:
+                self.hits += 1
+                self._valores.move_to_end(chave)
+                return item[1]
+            self.misses += 1
+            geracao = self._geracao
+
+        valor = calcular()
+        with self._lock:
+            # Invalidado durante o cálculo: o valor pode estar desatualizado
+            if geracao == self._geracao:
+                self._valores[chave] = (time.monotonic() + self.ttl, valor)
+                self._valores.move_to_end(chave)
+                if self.maximo and len(self._valores) > self.maximo:
+                    self._valores.popitem(last=False)
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._valores.clear()
+            self._geracao += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'cache': self.nome,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'itens': len(self._valores),
+                'maximo': self.maximo
+            }
+
+caches = []
+caches_por_tabela = {}
+
+# Registra um cache que deve ser esvaziado quando alguma das tabelas mudar
+def invalidar_ao_alterar(cache, *tabelas):
+    caches.append(cache)
+    for tabela in tabelas:
+        caches_por_tabela.setdefault(tabela, []).append(cache)
+    return cache
+
+# Para escritas que não passam pelo flush do ORM (ex.: INSERT em lote)
+def invalidar_tabelas(*tabelas):
+    for tabela in tabelas:
+        for cache in caches_por_tabela.get(tabela, ()):
+            cache.invalidar()
+
+# Para escritas em lote dentro de uma transação da sessão: os caches são
+# esvaziados no commit, como nas escritas que passam pelo flush
+def marcar_tabelas_alteradas(session, *tabelas):
+    session.info.setdefault('tabelas_alteradas', set()).update(tabelas)
+
+@event.listens_for(Session, 'after_flush')
+def registrar_tabelas_alteradas(session, flush_context):
+    alteradas = session.info.setdefault('tabelas_alteradas', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tabela = getattr(obj, '__tablename__', None)
+        if tabela in caches_por_tabela:
+            alteradas.add(tabela)
+
+@event.listens_for(Session, 'after_commit')
+def invalidar_caches(session):
+    invalidar_tabelas(*session.info.pop('tabelas_alteradas', ()))
+
+@event.listens_for(Session, 'after_rollback')
+def descartar_tabelas_alteradas(session):
+    session.info.pop('tabelas_alteradas', None)
@@ -0,0 +1,67 @@
+import gzip
+import os
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressão das respostas. Os arquivos estáticos são comprimidos uma vez na
+# inicialização (ver utils/estaticos.py), com o nível máximo; as respostas
+# JSON da API são comprimidas com gzip na hora, só acima de um tamanho mínimo,
+# abaixo do qual o ganho não paga o custo de CPU.
+#
+# Variáveis de ambiente:
+# - COMPRESSAO_MINIMA_BYTES: tamanho a partir do qual o JSON é comprimido
+# - COMPRESSAO_NIVEL_GZIP: nível do gzip na hora (1 a 9)
+
+COMPRESSAO_MINIMA = int(os.environ.get('COMPRESSAO_MINIMA_BYTES', 1024))
+NIVEL_GZIP = int(os.environ.get('COMPRESSAO_NIVEL_GZIP', 6))
+
+def comprimir_gzip(dados, nivel=NIVEL_GZIP):
+    # mtime=0: a mesma entrada gera sempre os mesmos bytes
+    return gzip.compress(dados, compresslevel=nivel, mtime=0)
+
+def comprimir_brotli(dados):
+    return brotli.compress(dados, quality=11) if brotli else None
+
+# Melhor codificação aceita pelo cliente entre as disponíveis (em ordem de
+# preferência), ou None para enviar sem compressão
+def escolher_codificacao(disponiveis):
+    for codificacao in disponiveis:
+        if request.accept_encodings[codificacao]:
+            return codificacao
+    return None
+
+# after_request: gzip das respostas JSON grandes. Respostas em streaming
+# (NDJSON, CSV) e já codificadas passam direto.
+def comprimir_json(resposta):
+    if (
+        resposta.mimetype != 'application/json'
+        or resposta.is_streamed
+        or resposta.direct_passthrough
+        or 'Content-Encoding' in resposta.headers
+    ):
+        return resposta
+
+    dados = resposta.get_data()
+    if len(dados) < COMPRESSAO_MINIMA:
+        return resposta
+
+    resposta.vary.add('Accept-Encoding')
+    if not escolher_codificacao(('gzip',)):
+        return resposta
+
+    resposta.set_data(comprimir_gzip(dados))
+    resposta.headers['Content-Encoding'] = 'gzip'
+    # O ETag de utils/etag.py identifica o conteúdo, não os bytes: vira fraco
+    # para continuar válido (If-None-Match compara de forma fraca) nas duas
+    # representações
+    etag, fraco = resposta.get_etag()
+    if etag and not fraco:
+        resposta.set_etag(etag, weak=True)
+    return resposta
+
+def comprimir_respostas(app):
+    app.after_request(comprimir_json)
@@ -0,0 +1,107 @@
+import hashlib
+import mimetypes
+import os
+from flask import Response, current_app, request
+from src.utils.compressao import comprimir_brotli, comprimir_gzip, escolher_codificacao
+
+# Serviço dos arquivos do frontend a partir de um manifesto em memória montado
+# na inicialização: cada arquivo é lido uma vez, identificado pelo hash do
+# conteúdo e guardado também comprimido (brotli, se instalado, e gzip no nível
+# máximo). As requisições não tocam o disco.
+#
+# Os arquivos referenciados pelas páginas HTML ganham um nome versionado
+# (script.js -> script.<hash>.js), reescrito no HTML, e são servidos com
+# Cache-Control immutable de um ano: uma alteração gera outro nome. O HTML e
+# os nomes originais usam no-cache com ETag, revalidados a cada carregamento.
+# Em modo debug o manifesto é refeito quando algum arquivo muda.
+
+MAX_AGE_VERSIONADO = 365 * 24 * 3600
+PAGINA_INICIAL = 'index.html'
+
+class Ativo:
+    def __init__(self, nome, dados):
+        self.mimetype = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        self.hash = hashlib.sha256(dados).hexdigest()[:16]
+        self.representacoes = {None: dados}
+        for codificacao, comprimir in (('br', comprimir_brotli), ('gzip', lambda d: comprimir_gzip(d, nivel=9))):
+            comprimido = comprimir(dados)
+            # Formatos já comprimidos (imagens etc.) ficam só com o original
+            if comprimido and len(comprimido) < len(dados):
+                self.representacoes[codificacao] = comprimido
+
+    def resposta(self, imutavel):
+        codificacao = escolher_codificacao([c for c in self.representacoes if c])
+        # Um ETag por representação: os bytes de cada codificação são diferentes
+        etag = f'{self.hash}-{codificacao}' if codificacao else self.hash
+
+        if request.if_none_match.contains(etag):
+            resposta = Response(status=304)
+        else:
+            resposta = Response(self.representacoes[codificacao], mimetype=self.mimetype)
+            if codificacao:
+                resposta.headers['Content-Encoding'] = codificacao
+
+        resposta.set_etag(etag)
+        if len(self.representacoes) > 1:
+            resposta.vary.add('Accept-Encoding')
+        if imutavel:
+            resposta.cache_control.public = True
+            resposta.cache_control.max_age = MAX_AGE_VERSIONADO
+            resposta.cache_control.immutable = True
+        else:
+            resposta.cache_control.no_cache = True
+        return resposta
+
+def nome_versionado(nome, hash):
+    raiz, extensao = os.path.splitext(nome)
+    return f'{raiz}.{hash[:12]}{extensao}'
+
+class Manifesto:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.carregar()
+
+    def _assinatura(self):
+        return sorted(
+            (os.path.join(raiz, arquivo), os.stat(os.path.join(raiz, arquivo)).st_mtime_ns)
+            for raiz, _, arquivos in os.walk(self.pasta) for arquivo in arquivos
+        )
+
+    def carregar(self):
+        self.assinatura = self._assinatura()
+        arquivos = {}
+        for caminho, _ in self.assinatura:
+            nome = os.path.relpath(caminho, self.pasta).replace(os.sep, '/')
+            with open(caminho, 'rb') as arquivo:
+                arquivos[nome] = arquivo.read()
+
+        # nome -> (ativo, imutável); primeiro os arquivos, depois o HTML que os referencia
+        rotas = {}
+        versionados = {}
+        for nome, dados in arquivos.items():
+            if not nome.endswith('.html'):
+                ativo = Ativo(nome, dados)
+                rotas[nome] = (ativo, False)
+                versionados[nome] = nome_versionado(nome, ativo.hash)
+                rotas[versionados[nome]] = (ativo, True)
+
+        for nome, dados in arquivos.items():
+            if nome.endswith('.html'):
+                pagina = dados.decode()
+                for original, versionado in versionados.items():
+                    pagina = pagina.replace(f'"{original}"', f'"{versionado}"')
+                rotas[nome] = (Ativo(nome, pagina.encode()), False)
+
+        self.rotas = rotas
+        self.versionados = versionados
+
+    # Caminho não encontrado cai no index.html (rotas do frontend)
+    def servir(self, caminho):
+        if current_app.debug and self._assinatura() != self.assinatura:
+            self.carregar()
+
+        item = self.rotas.get(caminho) or self.rotas.get(PAGINA_INICIAL)
+        if item is None:
+            return "index.html not found", 404
+        ativo, imutavel = item
+        return ativo.resposta(imutavel)
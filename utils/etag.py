@@ -0,0 +1,39 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import request, make_response
+from src.models.versao import versoes
+
+# Requisições condicionais para as listagens: o ETag é derivado da URL e das
+# versões das tabelas lidas pela rota, então pode ser calculado e comparado com
+# If-None-Match sem executar a consulta. Last-Modified é só informativo: com
+# resolução de segundos, duas escritas no mesmo segundo seriam indistinguíveis
+# via If-Modified-Since.
+# Cache-Control: no-cache faz o navegador revalidar a cada uso, enviando o ETag
+# guardado automaticamente nos fetch() do frontend.
+def condicional(*tabelas):
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # As versões são lidas antes dos dados: uma escrita concorrente no
+            # meio só pode deixar o corpo mais novo que o ETag (nunca o contrário)
+            atuais = versoes(*tabelas)
+            assinatura = '|'.join([request.full_path] + [f'{versao}:{data}' for versao, data in atuais])
+            etag = hashlib.sha1(assinatura.encode()).hexdigest()
+            datas = [atualizado_em for _, atualizado_em in atuais if atualizado_em]
+            ultima_alteracao = max(datas).replace(tzinfo=timezone.utc) if datas else None
+
+            if request.if_none_match.contains_weak(etag):
+                resposta = make_response('', 304)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            resposta.set_etag(etag)
+            if ultima_alteracao:
+                resposta.last_modified = ultima_alteracao
+            resposta.cache_control.no_cache = True
+            return resposta
+        return wrapper
+    return decorador
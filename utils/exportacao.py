@@ -0,0 +1,46 @@
+import csv
+import io
+from datetime import date
+from flask import Response, stream_with_context
+
+# Exportação CSV em streaming: as linhas são escritas num buffer pequeno,
+# esvaziado a cada LINHAS_POR_PEDACO linhas, então a memória usada não depende
+# do tamanho da exportação (desde que `linhas` também seja lido em lotes, ex.:
+# query.yield_per).
+LINHAS_POR_PEDACO = 1000
+
+def _celula(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+def gerar_csv(cabecalho, linhas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    # BOM para o Excel reconhecer o arquivo como UTF-8 (acentos nos nomes)
+    buffer.write('\ufeff')
+    escritor.writerow(cabecalho)
+    for numero, linha in enumerate(linhas, 1):
+        escritor.writerow([_celula(valor) for valor in linha])
+        if numero % LINHAS_POR_PEDACO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def resposta_csv(nome_arquivo, cabecalho, linhas):
+    return Response(
+        stream_with_context(gerar_csv(cabecalho, linhas)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'}
+    )
+
+# Lista de dicionários (resultado de um relatório) como CSV
+def resposta_csv_dicts(nome_arquivo, registros):
+    cabecalho = list(registros[0]) if registros else []
+    return resposta_csv(
+        nome_arquivo, cabecalho,
+        ([registro[campo] for campo in cabecalho] for registro in registros)
+    )
@@ -0,0 +1,29 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Codificador JSON das respostas: usa orjson quando instalado (bem mais rápido
+# em listas grandes) e cai no json da biblioteca padrão caso contrário.
+# Datas, Decimal, UUID etc. continuam passando pelo `default` do Flask, então
+# a saída é a mesma nos dois casos.
+class ProvedorJSON(DefaultJSONProvider):
+    sort_keys = False
+
+    if orjson is not None:
+        OPCOES = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+        def _codificar(self, obj):
+            return orjson.dumps(obj, default=self.default, option=self.OPCOES)
+
+        def dumps(self, obj, **kwargs):
+            # Opções específicas do json padrão (indent etc.) ficam com ele
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            return self._codificar(obj).decode()
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._codificar(obj), mimetype=self.mimetype)
@@ -0,0 +1,159 @@
+import cProfile
+import os
+import re
+import threading
+import time
+from collections import Counter
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Instrumentação das requisições: latência por rota (histograma), quantidade e
+# tempo das instruções SQL de cada requisição, detecção de N+1 (a mesma
+# instrução repetida muitas vezes numa requisição) e, opcionalmente, perfil
+# cProfile das requisições lentas. Tudo é exposto em /metrics no formato texto
+# do Prometheus. Os contadores são por processo: com vários workers, cada um
+# responde pelos seus (o Prometheus soma as séries). SQL executado depois da
+# resposta, no corpo de respostas em streaming, não entra na conta.
+#
+# Variáveis de ambiente:
+# - METRICAS_LIMITE_N_MAIS_1: repetições da mesma instrução que caracterizam N+1
+# - PERFIL_LIMIAR_MS: liga o cProfile; requisições mais lentas que isso têm o
+#   perfil gravado em PERFIL_DIR (padrão: ./perfis), para abrir com pstats/snakeviz
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITE_N_MAIS_1 = int(os.environ.get('METRICAS_LIMITE_N_MAIS_1', 10))
+PERFIL_LIMIAR_MS = float(os.environ.get('PERFIL_LIMIAR_MS', 0))
+PERFIL_DIR = os.environ.get('PERFIL_DIR', 'perfis')
+
+_NUMEROS = re.compile(r'\b\d+\b')
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requisicoes = Counter()  # (endpoint, metodo, status)
+        self.buckets = {}  # endpoint -> contagem por limite de latência
+        self.soma_latencia = Counter()
+        self.contagem_latencia = Counter()
+        self.sql_instrucoes = Counter()
+        self.sql_segundos = Counter()
+        self.n_mais_1 = Counter()
+
+    def registrar(self, endpoint, metodo, status, duracao, instrucoes, tempo_sql, suspeita_n_mais_1):
+        with self._lock:
+            self.requisicoes[(endpoint, metodo, status)] += 1
+            buckets = self.buckets.setdefault(endpoint, [0] * len(LIMITES_LATENCIA))
+            for indice, limite in enumerate(LIMITES_LATENCIA):
+                if duracao <= limite:
+                    buckets[indice] += 1
+            self.soma_latencia[endpoint] += duracao
+            self.contagem_latencia[endpoint] += 1
+            self.sql_instrucoes[endpoint] += instrucoes
+            self.sql_segundos[endpoint] += tempo_sql
+            if suspeita_n_mais_1:
+                self.n_mais_1[endpoint] += 1
+
+    def exportar(self):
+        linhas = []
+
+        def serie(nome, tipo, ajuda, valores):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+            for rotulos, valor in valores:
+                texto_rotulos = ','.join(f'{chave}="{v}"' for chave, v in rotulos)
+                linhas.append(f'{nome}{{{texto_rotulos}}} {valor}')
+
+        with self._lock:
+            serie('http_requisicoes_total', 'counter', 'Requisições por rota, método e status', [
+                ((('endpoint', e), ('metodo', m), ('status', s)), total)
+                for (e, m, s), total in sorted(self.requisicoes.items())
+            ])
+
+            linhas.append('# HELP http_requisicao_duracao_segundos Latência das requisições por rota')
+            linhas.append('# TYPE http_requisicao_duracao_segundos histogram')
+            for endpoint in sorted(self.buckets):
+                for limite, total in zip(LIMITES_LATENCIA, self.buckets[endpoint]):
+                    linhas.append(f'http_requisicao_duracao_segundos_bucket{{endpoint="{endpoint}",le="{limite}"}} {total}')
+                contagem = self.contagem_latencia[endpoint]
+                linhas.append(f'http_requisicao_duracao_segundos_bucket{{endpoint="{endpoint}",le="+Inf"}} {contagem}')
+                linhas.append(f'http_requisicao_duracao_segundos_sum{{endpoint="{endpoint}"}} {self.soma_latencia[endpoint]:.6f}')
+                linhas.append(f'http_requisicao_duracao_segundos_count{{endpoint="{endpoint}"}} {contagem}')
+
+            serie('sql_instrucoes_total', 'counter', 'Instruções SQL executadas por rota', [
+                ((('endpoint', e),), total) for e, total in sorted(self.sql_instrucoes.items())
+            ])
+            serie('sql_duracao_segundos_total', 'counter', 'Tempo gasto no banco por rota', [
+                ((('endpoint', e),), f'{total:.6f}') for e, total in sorted(self.sql_segundos.items())
+            ])
+            serie('sql_n_mais_1_total', 'counter', 'Requisições com suspeita de N+1 por rota', [
+                ((('endpoint', e),), total) for e, total in sorted(self.n_mais_1.items())
+            ])
+        return '\n'.join(linhas) + '\n'
+
+metricas = Metricas()
+
+# Tempo de cada instrução SQL, somado à requisição em andamento
+@event.listens_for(Engine, 'before_cursor_execute')
+def _inicio_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('inicio_sql', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _fim_sql(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info['inicio_sql'].pop()
+    if has_request_context() and 'sql_instrucoes' in g:
+        g.sql_instrucoes[_NUMEROS.sub('?', statement)] += 1
+        g.sql_segundos += duracao
+
+def _antes():
+    g.inicio_requisicao = time.perf_counter()
+    g.sql_instrucoes = Counter()
+    g.sql_segundos = 0.0
+    if PERFIL_LIMIAR_MS:
+        g.perfil = cProfile.Profile()
+        g.perfil.enable()
+
+def _depois(resposta):
+    if 'inicio_requisicao' not in g:
+        return resposta
+    duracao = time.perf_counter() - g.inicio_requisicao
+    endpoint = request.endpoint or 'desconhecido'
+    instrucoes = sum(g.sql_instrucoes.values())
+    repetida, repeticoes = g.sql_instrucoes.most_common(1)[0] if g.sql_instrucoes else ('', 0)
+    suspeita_n_mais_1 = repeticoes >= LIMITE_N_MAIS_1
+
+    if suspeita_n_mais_1:
+        current_app.logger.warning(
+            'Possível N+1 em %s: instrução repetida %d vezes: %s', endpoint, repeticoes, repetida[:200]
+        )
+
+    metricas.registrar(
+        endpoint, request.method, resposta.status_code, duracao, instrucoes, g.sql_segundos, suspeita_n_mais_1
+    )
+    resposta.headers['Server-Timing'] = (
+        f'db;dur={g.sql_segundos * 1000:.1f};desc="{instrucoes} sql", total;dur={duracao * 1000:.1f}'
+    )
+
+    perfil = g.pop('perfil', None)
+    if perfil:
+        perfil.disable()
+        if duracao * 1000 >= PERFIL_LIMIAR_MS:
+            os.makedirs(PERFIL_DIR, exist_ok=True)
+            perfil.dump_stats(os.path.join(
+                PERFIL_DIR, f'{endpoint}-{time.strftime("%Y%m%d-%H%M%S")}-{int(duracao * 1000)}ms.prof'
+            ))
+    return resposta
+
+# Garante que o profiler seja desligado mesmo se a requisição terminar em erro
+def _finalizar(erro=None):
+    perfil = g.pop('perfil', None)
+    if perfil:
+        perfil.disable()
+
+def exportar_metricas():
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+def instrumentar(app):
+    app.before_request(_antes)
+    app.after_request(_depois)
+    app.teardown_request(_finalizar)
+    app.add_url_rule('/metrics', 'metricas', exportar_metricas)